@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from xccdf_yaml.appdata import APPDATA
+
+BENCHMARK = """\
+benchmark:
+  id: 'sample_xccdf'
+  version: 0.1
+  title: Sample XCCDF Benchmark
+  description: |
+    Sample XCCDF Benchmark description
+  platform: 'cpe:/o:canonical:ubuntu_linux:16.04'
+  profiles:
+    - id: default
+      title: Default
+  groups:
+    - id: g1
+      title: Group one
+      description: Group *one*
+  rules:
+  - !include-dir 'checks'
+"""
+
+RULE = """\
+id: rule_{number:05d}
+type: cmd_exec
+title: "Rule {number}"
+group: {group}
+description: |
+  This is a *test* script number {number}
+rationale: |
+  Some **rationale**
+  - list
+  - items
+cmd: |
+  /bin/true {number}
+"""
+
+
+def write_rule_tree(path, count):
+    """ Writes benchmark with given number of rules, returns file name """
+    os.makedirs(os.path.join(path, 'checks'))
+    for number in range(count):
+        filename = os.path.join(path, 'checks',
+                                'rule_{:05d}.yaml'.format(number))
+        with open(filename, 'w') as f:
+            f.write(RULE.format(number=number,
+                                group='g1' if number % 2 else 'null'))
+    filename = os.path.join(path, 'benchmark.yaml')
+    with open(filename, 'w') as f:
+        f.write(BENCHMARK)
+    return filename
+
+
+@pytest.fixture
+def rule_tree(tmp_path):
+    """ Returns factory of generated benchmarks in temporary directory """
+    def factory(count=20):
+        return write_rule_tree(str(tmp_path / 'src'), count)
+    return factory
+
+
+@pytest.fixture
+def appdata(tmp_path):
+    """ Sets work and base directories to temporary directory, restores
+    application data on teardown
+    """
+    saved = APPDATA.copy()
+    APPDATA['workdir'] = str(tmp_path)
+    APPDATA['basedir'] = str(tmp_path)
+    yield APPDATA
+    for key, value in saved.items():
+        APPDATA[key] = value
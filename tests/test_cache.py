@@ -0,0 +1,60 @@
+import pickle
+
+import pytest
+
+import xccdf_yaml.cache
+from xccdf_yaml.cache import YamlCache
+
+
+@pytest.fixture
+def cache(appdata, tmp_path):
+    return YamlCache(str(tmp_path / 'cache'))
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'source.yaml'
+    path.write_text('key: value\n')
+    return str(path)
+
+
+def test_hit(cache, source):
+    cache.set(source, {'key': 'value'}, {source: xccdf_yaml.cache.digest(source)})
+    data, _ = cache.get(source)
+    assert data == {'key': 'value'}
+    assert cache.stats() == {'hits': 1, 'misses': 0}
+
+
+def test_changed_dependency(cache, source, tmp_path):
+    cache.set(source, {'key': 'value'}, {source: xccdf_yaml.cache.digest(source)})
+    (tmp_path / 'source.yaml').write_text('key: other\n')
+    assert cache.get(source) is None
+    assert cache.stats() == {'hits': 0, 'misses': 1}
+
+
+def test_code_changed(cache, source, monkeypatch):
+    cache.set(source, {'key': 'value'}, {source: xccdf_yaml.cache.digest(source)})
+    monkeypatch.setattr(xccdf_yaml.cache, '_code_digest', 'other')
+    assert cache.get(source) is None
+    assert cache.misses == 1
+
+
+class Unloadable(object):
+    def __reduce__(self):
+        # Loading fails like it does for a class renamed since the entry
+        # was written
+        return (int, ('not a number',))
+
+
+@pytest.mark.parametrize('content', [
+    b'',
+    b'garbage',
+    pickle.dumps({}) + pickle.dumps(Unloadable()),
+    pickle.dumps({}) + pickle.dumps({'key': 'value'})[:-4],
+], ids=['empty', 'garbage', 'unloadable', 'truncated'])
+def test_broken_entry_is_miss(cache, source, content):
+    cache.set(source, {'key': 'value'}, {})
+    with open(cache._entry(source), 'wb') as f:
+        f.write(content)
+    assert cache.get(source) is None
+    assert cache.stats() == {'hits': 0, 'misses': 1}
@@ -0,0 +1,42 @@
+import re
+
+import lxml.etree as etree
+
+from xccdf_yaml.core import XccdfYaml
+
+
+def convert(filename, outdir, **kwargs):
+    converter = XccdfYaml(workdir=str(outdir))
+    benchmark_file, _ = converter.convert(
+        filename=filename, output_basedir=str(outdir), no_cache=True,
+        **kwargs)
+    with open(benchmark_file, 'rb') as f:
+        output = f.read()
+    return converter._benchmark_parser.benchmark, strip_time(output)
+
+
+def strip_time(output):
+    """ Returns document without conversion time, which differs between
+    runs
+    """
+    return re.sub(br' time="[^"]*"', b'', output)
+
+
+def tostring(element):
+    return strip_time(etree.tostring(element, encoding='utf-8',
+                                     xml_declaration=True, pretty_print=True))
+
+
+def test_parallel_benchmark_xml(rule_tree, tmp_path):
+    filename = rule_tree(40)
+    benchmark, output = convert(filename, tmp_path / 'serial')
+    parallel, parallel_output = convert(filename, tmp_path / 'parallel',
+                                        jobs=2)
+
+    # Rules built by workers are kept as fragments, those must be usable
+    # as elements after the conversion
+    assert tostring(parallel.xml()) == tostring(benchmark.xml())
+    assert strip_time(str(parallel).encode()) == \
+        strip_time(str(benchmark).encode())
+    assert tostring(parallel.xml()) == parallel_output
+    assert parallel_output == output
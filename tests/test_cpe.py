@@ -0,0 +1,91 @@
+import pytest
+
+import xccdf_yaml.cpe
+from xccdf_yaml.cpe import get_affected_from_cpe
+from xccdf_yaml.oval.parsers.dpkginfo import DpkginfoParser
+from xccdf_yaml.xccdf.elements import XccdfGenerator
+
+UBUNTU = 'cpe:/o:canonical:ubuntu_linux:16.04'
+RHEL = 'cpe:/o:redhat:enterprise_linux:6'
+
+
+@pytest.fixture
+def parse_count(monkeypatch):
+    """ Returns list of CPE strings parsed since the fixture was set up """
+    monkeypatch.setattr(xccdf_yaml.cpe, '_affected', {})
+    parsed = []
+    parse_affected = xccdf_yaml.cpe._parse_affected
+
+    def _parse_affected(cpe_string):
+        parsed.append(cpe_string)
+        return parse_affected(cpe_string)
+
+    monkeypatch.setattr(xccdf_yaml.cpe, '_parse_affected', _parse_affected)
+    return parsed
+
+
+@pytest.fixture
+def benchmark():
+    return XccdfGenerator('mirantis.com').benchmark('test')
+
+
+def test_affected_memoized(parse_count):
+    assert get_affected_from_cpe(UBUNTU) == 'Ubuntu 1604'
+    assert get_affected_from_cpe(UBUNTU) == 'Ubuntu 1604'
+    assert parse_count == [UBUNTU]
+
+
+def test_affected_none_memoized(monkeypatch):
+    parsed = []
+
+    def _parse_affected(cpe_string):
+        parsed.append(cpe_string)
+
+    monkeypatch.setattr(xccdf_yaml.cpe, '_affected', {})
+    monkeypatch.setattr(xccdf_yaml.cpe, '_parse_affected', _parse_affected)
+    assert get_affected_from_cpe(UBUNTU) is None
+    assert get_affected_from_cpe(UBUNTU) is None
+    assert parsed == [UBUNTU]
+
+
+def test_platform_table_lazy(benchmark, parse_count):
+    benchmark.add_platform(UBUNTU)
+    benchmark.add_platform('custom-platform')
+    benchmark.add_platform(RHEL)
+
+    table = benchmark.platform_table
+    assert parse_count == []
+
+    # Platforms which are not CPE names are skipped
+    assert list(table) == [UBUNTU, RHEL]
+    assert 'custom-platform' not in table
+    assert parse_count == []
+
+    assert table[RHEL] == 'Red Hat Enterprise Linux 6'
+    assert table[RHEL] == 'Red Hat Enterprise Linux 6'
+    assert parse_count == [RHEL]
+
+    assert table.items() == [(UBUNTU, 'Ubuntu 1604'),
+                             (RHEL, 'Red Hat Enterprise Linux 6')]
+    assert parse_count == [RHEL, UBUNTU]
+
+    # Platforms added later are in the table as well
+    benchmark.add_platform('cpe:/o:debianproject:debian:8')
+    assert len(table) == 3
+
+
+def test_oval_parser_affected(appdata, benchmark, parse_count):
+    benchmark.add_platform(UBUNTU)
+    parser = DpkginfoParser(XccdfGenerator('mirantis.com'), benchmark)
+
+    result = parser.parse('test', {
+        'name': 'openssh-server',
+        'affected': [UBUNTU, 'Custom Linux 1'],
+    })
+    platforms = result.definition.xml().iterfind(
+        './/{*}affected/{*}platform')
+    assert [x.text for x in platforms] == ['Ubuntu 1604', 'Custom Linux 1']
+    assert parse_count == [UBUNTU]
+
+    parser.parse('other', {'name': 'openssh-server', 'affected': UBUNTU})
+    assert parse_count == [UBUNTU]
@@ -0,0 +1,60 @@
+import time
+
+import lxml.etree as etree
+import markdown
+
+from xccdf_yaml.markdown import MarkdownHtml
+
+XHTML = '{http://www.w3.org/1999/xhtml}'
+
+PARAGRAPHS = 5000
+
+DEPTH = 5000
+
+# Renaming is linear, the large text takes a fraction of a second
+RENAME_TIME_BUDGET = 5.0
+
+
+def tags(root):
+    return [x.tag for x in root.iter() if isinstance(x.tag, str)]
+
+
+def set_default_ns(html):
+    """ Returns html renamed into XHTML namespace and time it took """
+    start = time.perf_counter()
+    root = MarkdownHtml('text').set_default_ns(html, default_ns='xhtml')
+    return root, time.perf_counter() - start
+
+
+def test_set_default_ns_large_text():
+    text = '\n\n'.join(
+        'Paragraph {} with *emphasis* and `code`\n\n'
+        '- item {}\n- item'.format(x, x)
+        for x in range(PARAGRAPHS))
+    html = etree.HTML(markdown.markdown(text))
+    count = len(tags(html))
+
+    root, elapsed = set_default_ns(html)
+
+    print('\nset_default_ns: {} elements in {:.3f}s'.format(count, elapsed))
+    assert elapsed < RENAME_TIME_BUDGET
+    result = tags(root)
+    assert len(result) == count
+    assert all(x.startswith(XHTML) for x in result)
+    assert root.findtext('.//{0}body/{0}p/{0}em'.format(XHTML)) == 'emphasis'
+
+
+def test_set_default_ns_deep_nesting():
+    # Deeper than the recursion limit
+    html = etree.Element('html')
+    element = etree.SubElement(html, 'body')
+    for x in range(DEPTH):
+        element = etree.SubElement(element, 'blockquote')
+        element.text = 'level {}'.format(x)
+
+    root, _ = set_default_ns(html)
+
+    result = tags(root)
+    assert len(result) == DEPTH + 2
+    assert all(x.startswith(XHTML) for x in result)
+    assert list(root.iter())[-1].text == 'level {}'.format(DEPTH - 1)
@@ -0,0 +1,55 @@
+import os
+import tracemalloc
+
+from xccdf_yaml.core import XccdfYaml
+from xccdf_yaml.xccdf.elements import XccdfGenerator
+from xccdf_yaml.xccdf.parsers import XccdfYamlBenchmarkParser
+from xccdf_yaml.xml import XmlCommon
+from xccdf_yaml.yaml import load_yaml
+
+RULES = 1000
+
+# Memory held by the parsed benchmark per rule, bytes. A rule makes
+# about ten elements, ~7 KB per rule is held with slotted elements.
+RULE_MEMORY_BUDGET = 16 * 1024
+
+
+def walk(element):
+    # Children of XCCDF items are put into the tree on rendering
+    element.update_elements()
+    yield element
+    for child in element.ordered_elements():
+        if isinstance(child, XmlCommon):
+            yield from walk(child)
+
+
+def parse(filename, workdir):
+    converter = XccdfYaml(workdir=workdir)
+    converter.basedir = os.path.dirname(filename)
+    converter.setup_cache(no_cache=True)
+    converter.setup_jobs(1)
+    data = load_yaml(filename)
+
+    tracemalloc.start()
+    try:
+        parser = XccdfYamlBenchmarkParser(XccdfGenerator('mirantis.com'),
+                                          converter.basedir, workdir)
+        parser.parse(data['benchmark'])
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return parser.benchmark, size
+
+
+def test_elements_memory(rule_tree, tmp_path):
+    filename = rule_tree(RULES)
+    benchmark, size = parse(filename, str(tmp_path))
+
+    elements = list(walk(benchmark))
+    with_dict = [x for x in elements if hasattr(x, '__dict__')]
+    print('\nParsed {} rules: {} elements, {} with __dict__, {:.1f} MB, '
+          '{:.0f} bytes per rule'.format(RULES, len(elements),
+                                         len(with_dict), size / 2 ** 20,
+                                         size / RULES))
+    assert [type(x).__name__ for x in with_dict] == []
+    assert size < RULE_MEMORY_BUDGET * RULES
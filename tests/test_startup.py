@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+
+# Modules imported only by commands that need them
+HEAVY_MODULES = ('lxml', 'markdown', 'jsonschema', 'cpe')
+
+# Cumulative import time of the CLI, microseconds. Most of it is cliff,
+# the limit is loose enough to not fail on slow machines.
+IMPORT_TIME_BUDGET = 1000000
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(module):
+    """ Returns {module name: cumulative import time in microseconds} of
+    modules imported by the module in a new interpreter
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         'import {}'.format(module)],
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True)
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        try:
+            times[name.strip()] = int(cumulative)
+        except ValueError:
+            # Header line
+            continue
+    return times
+
+
+def test_heavy_modules_not_imported():
+    times = import_times('xccdf_yaml.cli.app')
+    assert 'xccdf_yaml.cli.app' in times
+    imported = [x for x in times if x.split('.')[0] in HEAVY_MODULES]
+    assert imported == []
+
+
+def test_import_time():
+    # The best of several runs, the first one may read modules from disk
+    best = min(import_times('xccdf_yaml.cli.app')['xccdf_yaml.cli.app']
+               for _ in range(3))
+    assert best < IMPORT_TIME_BUDGET
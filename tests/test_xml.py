@@ -0,0 +1,75 @@
+import time
+
+from xccdf_yaml.xml import XmlCommon
+
+NSMAP = {None: 'urn:test'}
+
+CHILDREN = 50000
+
+# Appending is linear, 50k children take tens of milliseconds. Quadratic
+# membership checks would take minutes.
+APPEND_TIME_BUDGET = 5.0
+
+
+def element(name):
+    return XmlCommon(name, nsmap=NSMAP)
+
+
+def names(parent):
+    return [x.get_attr('id') for x in parent.ordered_elements()]
+
+
+def make_children(count, name='item'):
+    return [element(name).set_attr('id', str(x)) for x in range(count)]
+
+
+def test_append_order():
+    parent = element('parent')
+    a, b, c = make_children(3)
+    for child in (a, b, c):
+        parent.append(child)
+    assert names(parent) == ['0', '1', '2']
+
+    # Appending a child twice doesn't duplicate it
+    parent.append(a)
+    assert names(parent) == ['0', '1', '2']
+
+    parent.remove_elements(elements=[b])
+    assert names(parent) == ['0', '2']
+
+    # Re-appended child goes to the end
+    parent.append(b)
+    assert names(parent) == ['0', '2', '1']
+    assert [x.get('id') for x in parent.xml()] == ['0', '2', '1']
+
+
+def test_append_order_by_name():
+    parent = element('parent').set_elements_order(['first', 'second'])
+    second, = make_children(1, name='second')
+    first, = make_children(1, name='first')
+    other, = make_children(1, name='other')
+    for child in (other, second, first):
+        parent.append(child)
+    assert [x._name for x in parent.ordered_elements()] == \
+        ['first', 'second', 'other']
+
+
+def test_append_many():
+    parent = element('parent')
+    children = make_children(CHILDREN)
+
+    start = time.perf_counter()
+    for child in children:
+        parent.append(child)
+    elapsed = time.perf_counter() - start
+
+    print('\nXmlCommon.append: {} children in {:.3f}s'
+          .format(CHILDREN, elapsed))
+    assert elapsed < APPEND_TIME_BUDGET
+    assert list(parent.ordered_elements()) == children
+
+    removed = children[::2]
+    parent.remove_elements(elements=removed)
+    for child in removed:
+        parent.append(child)
+    assert list(parent.ordered_elements()) == children[1::2] + removed
@@ -0,0 +1,45 @@
+import time
+
+import pytest
+
+import xccdf_yaml.yaml
+from xccdf_yaml.appdata import APPDATA
+from xccdf_yaml.yaml import CYamlLoader, YamlLoader
+
+RULES = 500
+
+
+@pytest.fixture
+def no_yaml_cache():
+    cache = APPDATA['yaml_cache']
+    APPDATA['yaml_cache'] = None
+    yield
+    APPDATA['yaml_cache'] = cache
+
+
+def load(loader_cls, filename, monkeypatch):
+    """ Returns data loaded by loader_cls and rules per second """
+    # Included files are loaded with the default loader
+    monkeypatch.setattr(xccdf_yaml.yaml, 'DefaultYamlLoader', loader_cls)
+    start = time.perf_counter()
+    data = xccdf_yaml.yaml.load_yaml(filename)
+    elapsed = time.perf_counter() - start
+    return data, len(rules(data)) / elapsed
+
+
+def rules(data):
+    # !include-dir is an item of the rules list
+    return [x for item in data['benchmark']['rules'] for x in item]
+
+
+@pytest.mark.skipif(CYamlLoader is None, reason='LibYAML is not available')
+def test_loaders_throughput(rule_tree, no_yaml_cache, monkeypatch):
+    filename = rule_tree(RULES)
+
+    data, rate = load(YamlLoader, filename, monkeypatch)
+    c_data, c_rate = load(CYamlLoader, filename, monkeypatch)
+
+    print('\nYamlLoader: {:.0f} rules/sec, CYamlLoader: {:.0f} rules/sec'
+          .format(rate, c_rate))
+    assert len(rules(data)) == RULES
+    assert c_data == data
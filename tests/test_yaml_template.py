@@ -0,0 +1,34 @@
+import pytest
+
+from xccdf_yaml.yaml import get_template, load_yaml
+
+DOCUMENT = """\
+rule: !merge
+  filename: templates.yaml
+  key: base
+  content:
+    title: Rule
+"""
+
+
+@pytest.fixture
+def document(appdata, tmp_path):
+    appdata['yaml_cache'] = None
+    (tmp_path / 'templates.yaml').write_text('base:\n  type: sce\n')
+    path = tmp_path / 'document.yaml'
+    path.write_text(DOCUMENT)
+    return str(path)
+
+
+def test_template_shared(document, tmp_path):
+    assert load_yaml(document) == {'rule': {'type': 'sce', 'title': 'Rule'}}
+    template = get_template(str(tmp_path / 'templates.yaml'))
+    load_yaml(document)
+    assert get_template(str(tmp_path / 'templates.yaml')) is template
+
+
+def test_template_changed(document, tmp_path):
+    load_yaml(document)
+    (tmp_path / 'templates.yaml').write_text('base:\n  type: cmd_exec\n')
+    assert load_yaml(document) == {
+        'rule': {'type': 'cmd_exec', 'title': 'Rule'}}
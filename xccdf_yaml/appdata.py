@@ -7,6 +7,10 @@ class AppData(local):
     def __init__(self):
         self._ = {
             'workdir': os.getcwd(),
+            'yaml_cache': None,
+            'jobs': 1,
+            # zlib compression level of code values
+            'compress_level': -1,
         }
 
     def __getitem__(self, item):
@@ -15,5 +19,16 @@ class AppData(local):
     def __setitem__(self, key, value):
         self._[key] = value
 
+    def copy(self):
+        return dict(self._)
+
 
 APPDATA = AppData()
+
+
+def init_worker(appdata):
+    """ Initializes worker process with application data of the parent """
+    for key, value in appdata.items():
+        APPDATA[key] = value
+    # Worker processes do not start pools of their own
+    APPDATA['jobs'] = 1
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+from xccdf_yaml.appdata import APPDATA
+
+
+def cache_dir(*args):
+    return os.path.join(APPDATA['workdir'], '.cache', 'xccdf_yaml', *args)
+
+
+def digest(path):
+    """ Returns sha256 hex digest of a file content or of a directory
+    listing. Returns None if path doesn't exist.
+    """
+    if os.path.isdir(path):
+        listing = '\n'.join(sorted(os.listdir(path)))
+        return hashlib.sha256(listing.encode()).hexdigest()
+
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+class YamlCache(object):
+    """ On-disk cache of parsed YAML documents.
+
+    Every entry holds data constructed from a single file together with
+    digests of all files it depends on (the file itself, files pulled by
+    #%include%, !include, !include-dir, !include-raw and !merge). Entry is
+    considered valid only if all these digests still match. Entries
+    written by a different version of the package are not used, and
+    entries that can't be loaded are counted as misses.
+    """
+    def __init__(self, path=None):
+        self.path = path or cache_dir('yaml')
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, filename, lazy=False):
+        key = json.dumps([os.path.abspath(filename),
+                          APPDATA['basedir'],
+                          APPDATA['workdir'],
+                          lazy,
+                          code_digest()])
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _entry(self, filename, lazy=False):
+        return os.path.join(self.path, '{}.pickle'.format(
+            self._key(filename, lazy=lazy)))
+
+    def get(self, filename, lazy=False):
+        try:
+            with open(self._entry(filename, lazy=lazy), 'rb') as f:
+                dependencies = pickle.load(f)
+                for path, value in dependencies.items():
+                    if digest(path) != value:
+                        break
+                else:
+                    data = pickle.load(f)
+                    self.hits += 1
+                    return data, dependencies
+        except Exception:
+            # Unpickling may fail in many ways on a truncated entry or
+            # an entry referring to classes that were changed
+            pass
+
+        self.misses += 1
+        return None
+
+    def set(self, filename, data, dependencies, lazy=False):
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmpname = tempfile.mkstemp(dir=self.path)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(dependencies, f, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmpname, self._entry(filename, lazy=lazy))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            os.remove(tmpname)
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def __str__(self):
+        return 'YAML cache {}: {} hits, {} misses'.format(
+            self.path, self.hits, self.misses)
+
+
+_code_digest = None
+
+
+def code_digest():
+    """ Returns digest of xccdf_yaml sources. Build results produced by
+    a different version of the package are never reused.
+    """
+    global _code_digest
+    if _code_digest is None:
+        sha = hashlib.sha256()
+        root = os.path.dirname(os.path.abspath(__file__))
+        for path, dirs, files in sorted(os.walk(root)):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith('.py'):
+                    with open(os.path.join(path, name), 'rb') as f:
+                        sha.update(f.read())
+        _code_digest = sha.hexdigest()
+    return _code_digest
+
+
+class BuildManifest(object):
+    """ Results of the previous conversion of a source document.
+
+    Rule records are keyed by a digest of everything the rule is built
+    from (its fully resolved YAML data, so included files and templates
+    are covered, and the benchmark context). Exported files are recorded
+    with a fingerprint of their content and the size and mtime of the
+    written file, so unchanged files are not rewritten.
+    """
+    def __init__(self, filename, path=None):
+        key = hashlib.sha256(os.path.abspath(filename).encode()).hexdigest()
+        self.path = os.path.join(path or cache_dir('build'),
+                                 '{}.pickle'.format(key))
+        self._rules = {}
+        self._used_rules = {}
+        self._files = {}
+        self.hits = 0
+        self.misses = 0
+        self.skipped_files = 0
+
+    @staticmethod
+    def digest(*args):
+        try:
+            data = json.dumps(args, sort_keys=True, default=str).encode()
+        except TypeError:
+            data = pickle.dumps(args, pickle.HIGHEST_PROTOCOL)
+        return hashlib.sha256(data).hexdigest()
+
+    def load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                if pickle.load(f) != code_digest():
+                    return self
+                self._rules, self._files = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError,
+                AttributeError, ValueError):
+            self._rules, self._files = {}, {}
+        return self
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(self.path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(code_digest(), f, pickle.HIGHEST_PROTOCOL)
+                pickle.dump((self._used_rules, self._files), f,
+                            pickle.HIGHEST_PROTOCOL)
+            os.replace(tmpname, self.path)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            os.remove(tmpname)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def get_rule(self, key):
+        record = self._rules.get(key)
+        if record is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._used_rules[key] = record
+        return record
+
+    def set_rule(self, key, record):
+        self._used_rules[key] = record
+
+    def is_exported(self, target, fingerprint):
+        """ Returns True if target was written from content with the same
+        fingerprint and wasn't modified since then.
+        """
+        if fingerprint is None or self._files.get(target, [None])[0] \
+                != fingerprint:
+            return False
+        try:
+            x = os.stat(target)
+        except OSError:
+            return False
+        if self._files[target][1:] != [x.st_size, x.st_mtime_ns]:
+            return False
+        self.skipped_files += 1
+        return True
+
+    def set_exported(self, target, fingerprint):
+        x = os.stat(target)
+        self._files[target] = [fingerprint, x.st_size, x.st_mtime_ns]
+
+    def __str__(self):
+        return 'Build manifest {}: {} rules reused, {} rebuilt, ' \
+               '{} files unchanged'.format(self.path, self.hits,
+                                           self.misses, self.skipped_files)
@@ -12,9 +12,11 @@ from xccdf_yaml.appdata import APPDATA
 class XCCDF_YAML_Manager(CommandManager):
     SHELL_COMMANDS = {
         'convert': cli.CliConvertYaml,
+        'convert-batch': cli.CliConvertBatch,
         'load': cli.CliLoadYaml,
         'validate': cli.CliValidateYaml,
         'schematron': cli.CliSchematron,
+        'schematron-update': cli.CliSchematronUpdate,
         'datastream': cli.CliDatastream,
         'about-parser': cli.CliAboutParser,
         'list-parsers': cli.CliListParsers,
@@ -3,12 +3,56 @@ import os
 
 from cliff.command import Command
 from cliff.lister import Lister
-from xccdf_yaml.oval.parsers import PARSERS
 
 from xccdf_yaml.appdata import APPDATA
-from xccdf_yaml.xccdf.elements import XccdfBenchmarkElement
-from xccdf_yaml.oval.elements import OvalDefinitions
-from xccdf_yaml.core import XccdfYaml
+
+# Commands import their dependencies (lxml, markdown, jsonschema, parsers)
+# in take_action(), so the tool starts fast and --help or listing parsers
+# doesn't load the whole conversion machinery.
+
+
+def add_cache_arguments(parser):
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Do not use parsed YAML cache')
+    parser.add_argument('--clear-cache', action='store_true',
+                        help='Clear parsed YAML cache before loading')
+    return parser
+
+
+def add_jobs_argument(parser):
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='Number of worker processes')
+    return parser
+
+
+def add_compress_level_argument(parser):
+    parser.add_argument('--compress-level', type=int, default=-1,
+                        choices=range(-1, 10), metavar='{-1..9}',
+                        help='zlib compression level of code values, '
+                             '-1 is zlib default')
+    return parser
+
+
+def add_link_files_argument(parser):
+    parser.add_argument('--link-files', action='store_true',
+                        help='Hardlink shared files to the output directory '
+                             'instead of copying them when possible')
+    return parser
+
+
+def add_datastream_arguments(parser):
+    parser.add_argument('--scap-version', choices=['1.2', '1.3'],
+                        default='1.3',
+                        help='SCAP version of the source data stream')
+    parser.add_argument('--oscap', action='store_true',
+                        help='Compose source data stream with oscap')
+    return parser
+
+
+def log_cache_stats(log):
+    cache = APPDATA['yaml_cache']
+    if cache is not None:
+        log.info(str(cache))
 
 
 class CliConvertYaml(Command):
@@ -24,15 +68,31 @@ class CliConvertYaml(Command):
         parser.add_argument('--schematron-file', default=None)
         parser.add_argument('--datastream', action='store_true')
         parser.add_argument('--datastream-file', default=None)
+        add_datastream_arguments(parser)
         parser.add_argument('--skip-valid', action='store_true')
+        parser.add_argument('--stream', action='store_true',
+                            help='Load, parse and write rules one by one')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Reuse rules and files built by the '
+                                 'previous conversion if their sources '
+                                 'are unchanged')
+        add_cache_arguments(parser)
+        add_jobs_argument(parser)
+        add_compress_level_argument(parser)
+        add_link_files_argument(parser)
         parser.add_argument('filename')
         return parser
 
     def take_action(self, parsed_args):
+        from xccdf_yaml.core import XccdfYaml
+
         APPDATA['basedir'] = os.path.dirname(parsed_args.filename)
         xccdf_yaml = XccdfYaml()
         benchmark_file, tailoring_file = \
             xccdf_yaml.convert(**vars(parsed_args))
+        log_cache_stats(self.log)
+        if xccdf_yaml.manifest is not None:
+            self.log.info(str(xccdf_yaml.manifest))
 
         if parsed_args.schema:
             xccdf_yaml.validate(
@@ -49,7 +109,73 @@ class CliConvertYaml(Command):
         if parsed_args.datastream:
             xccdf_yaml.datastream(filename=benchmark_file,
                                   skip_valid=parsed_args.skip_valid,
-                                  output_file=parsed_args.datastream_file)
+                                  output_file=parsed_args.datastream_file,
+                                  oscap=parsed_args.oscap,
+                                  scap_version=parsed_args.scap_version)
+
+
+class CliConvertBatch(Lister):
+    log = logging.getLogger(__name__)
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument('--output-basedir', default='output')
+        parser.add_argument('--schema', default=None)
+        parser.add_argument('--schematron', action='store_true')
+        parser.add_argument('--schematron-file', default=None)
+        parser.add_argument('--datastream', action='store_true')
+        add_datastream_arguments(parser)
+        parser.add_argument('--skip-valid', action='store_true')
+        parser.add_argument('--stream', action='store_true',
+                            help='Load, parse and write rules one by one')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Reuse rules and files built by the '
+                                 'previous conversion if their sources '
+                                 'are unchanged')
+        parser.add_argument('--manifest', dest='batch_manifest',
+                            default=None,
+                            help='YAML list of documents to convert')
+        add_cache_arguments(parser)
+        add_jobs_argument(parser)
+        add_compress_level_argument(parser)
+        add_link_files_argument(parser)
+        parser.add_argument('filenames', nargs='*')
+        return parser
+
+    def take_action(self, parsed_args):
+        from xccdf_yaml.core import XccdfYaml
+
+        if not parsed_args.filenames and not parsed_args.batch_manifest:
+            raise Exception("No documents to convert")
+
+        xccdf_yaml = XccdfYaml()
+        results = xccdf_yaml.convert_batch(**vars(parsed_args))
+        log_cache_stats(self.log)
+
+        for filename, benchmark_file, tailoring_file in results:
+            if benchmark_file is None:
+                continue
+
+            if parsed_args.schema:
+                xccdf_yaml.validate(
+                    filename=benchmark_file,
+                    schema=parsed_args.schema,
+                    skip_valid=parsed_args.skip_valid,
+                )
+
+            if parsed_args.schematron:
+                xccdf_yaml.schematron(
+                    filename=benchmark_file,
+                    schematron_file=parsed_args.schematron_file)
+
+            if parsed_args.datastream:
+                xccdf_yaml.datastream(filename=benchmark_file,
+                                      skip_valid=parsed_args.skip_valid,
+                                      oscap=parsed_args.oscap,
+                                      scap_version=parsed_args.scap_version)
+
+        cols = ('Filename', 'Benchmark', 'Tailoring')
+        return cols, results
 
 
 class CliLoadYaml(Command):
@@ -62,13 +188,19 @@ class CliLoadYaml(Command):
         parser.add_argument('--indent', type=int, default=2)
         parser.add_argument('--pretty', action='store_true')
         parser.add_argument('--output')
+        add_cache_arguments(parser)
+        add_jobs_argument(parser)
         parser.add_argument('filename')
         return parser
 
     def take_action(self, parsed_args):
+        from xccdf_yaml.core import XccdfYaml
+
         APPDATA['basedir'] = os.path.dirname(parsed_args.filename)
         xccdf_yaml = XccdfYaml()
-        return xccdf_yaml.load(**vars(parsed_args))
+        result = xccdf_yaml.load(**vars(parsed_args))
+        log_cache_stats(self.log)
+        return result
 
 
 class CliValidateYaml(Command):
@@ -84,14 +216,20 @@ class CliValidateYaml(Command):
         parser.add_argument('--schematron', action='store_true')
         parser.add_argument('--schematron-file', default=None)
         parser.add_argument('--skip-valid', action='store_true')
+        add_cache_arguments(parser)
+        add_jobs_argument(parser)
         parser.add_argument('filename')
         return parser
 
     def take_action(self, parsed_args):
+        from xccdf_yaml.core import XccdfYaml
+
         APPDATA['basedir'] = os.path.dirname(parsed_args.filename)
         xccdf_yaml = XccdfYaml(basedir=self.app.appdata['basedir'],
                                workdir=self.app.appdata['workdir'])
-        return xccdf_yaml.validate(**vars(parsed_args))
+        result = xccdf_yaml.validate(**vars(parsed_args))
+        log_cache_stats(self.log)
+        return result
 
 
 class CliSchematron(Command):
@@ -105,6 +243,8 @@ class CliSchematron(Command):
         return parser
 
     def take_action(self, parsed_args):
+        from xccdf_yaml.core import XccdfYaml
+
         APPDATA['basedir'] = os.path.dirname(parsed_args.filename)
         if parsed_args.workdir:
             self.app.appdata['workdir'] = parsed_args.workdir
@@ -112,6 +252,26 @@ class CliSchematron(Command):
         return xccdf_yaml.schematron(**vars(parsed_args))
 
 
+class CliSchematronUpdate(Command):
+    log = logging.getLogger(__name__)
+
+    def get_parser(self, prog_name):
+        from xccdf_yaml.validators import NIST_SCHEMATRON_URL
+
+        parser = super().get_parser(prog_name)
+        parser.add_argument('--url', default=NIST_SCHEMATRON_URL,
+                            help='Schematron to download')
+        parser.add_argument('--file', dest='filename', default=None,
+                            help='Use local file instead of downloading')
+        return parser
+
+    def take_action(self, parsed_args):
+        from xccdf_yaml.core import XccdfYaml
+
+        xccdf_yaml = XccdfYaml()
+        return xccdf_yaml.schematron_update(**vars(parsed_args))
+
+
 class CliDatastream(Command):
     log = logging.getLogger(__name__)
 
@@ -121,10 +281,13 @@ class CliDatastream(Command):
         parser.add_argument('--schematron', action='store_true')
         parser.add_argument('--schematron-file', default=None)
         parser.add_argument('--skip-valid', action='store_true')
+        add_datastream_arguments(parser)
         parser.add_argument('filename')
         return parser
 
     def take_action(self, parsed_args):
+        from xccdf_yaml.core import XccdfYaml
+
         APPDATA['basedir'] = os.path.dirname(parsed_args.filename)
         xccdf_yaml = XccdfYaml(basedir=self.app.appdata['basedir'],
                                workdir=self.app.appdata['workdir'])
@@ -155,6 +318,8 @@ class CliTestXccdf(Command):
         return parser
 
     def take_action(self, parsed_args):
+        from xccdf_yaml.xccdf.elements import XccdfBenchmarkElement
+
         benchmark = XccdfBenchmarkElement('test_benchmark')\
             .set_title('Title')\
             .set_description('<b>Description</b>')
@@ -195,6 +360,8 @@ class CliTestOval(Command):
     log = logging.getLogger(__name__)
 
     def take_action(self, parsed_args):
+        from xccdf_yaml.oval.elements import OvalDefinitions
+
         oval_definitions = OvalDefinitions()
 
         """
@@ -532,6 +699,8 @@ class CliAboutParser(Command):
         return parser
 
     def take_action(self, parsed_args):
+        from xccdf_yaml.oval.parsers import PARSERS
+
         cls = PARSERS.get(parsed_args.name)
         print(cls.about())
 
@@ -540,8 +709,10 @@ class CliListParsers(Lister):
     log = logging.getLogger(__name__)
 
     def take_action(self, parsed_args):
+        from xccdf_yaml.oval.parsers import PARSERS
+
         cols = ('Name', 'About')
         rows = []
-        for cls in PARSERS.values():
-            rows.append((cls.name(), cls.about()))
+        for name, cls in PARSERS.items():
+            rows.append((name, cls.about()))
         return cols, rows
@@ -1,10 +1,89 @@
+import hashlib
 import os
 import shutil
 import stat
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from xccdf_yaml.misc import resolve_file_ref
 from xccdf_yaml.appdata import APPDATA
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ioctl request cloning file extents (Linux, btrfs/xfs/...)
+FICLONE = 0x40049409
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _is_same_file(target, size, sha256, mtime_ns=None):
+    """ Returns True if target has given size and content digest.
+    Digest is a callable, so it is computed only when sizes match and
+    target modification time differs from mtime_ns.
+    """
+    try:
+        x = os.stat(target)
+    except OSError:
+        return False
+    if x.st_size != size:
+        return False
+    if mtime_ns is not None and x.st_mtime_ns == mtime_ns:
+        return True
+    return _file_digest(target) == sha256()
+
+
+def _reflink(source, target):
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+    except OSError:
+        return False
+    return True
+
+
+def copy_file(source, target, link=False):
+    """ Copies source file to target. Target is hardlinked to source if
+    link is set and both are on the same filesystem, otherwise it is
+    reflinked where filesystem supports it or copied in kernel with
+    copy_file_range/sendfile.
+    """
+    if os.path.lexists(target):
+        os.unlink(target)
+
+    if link:
+        try:
+            os.link(source, target)
+            return
+        except OSError:
+            pass
+
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        if _reflink(src, dst):
+            return
+        if hasattr(os, 'copy_file_range'):
+            try:
+                while os.copy_file_range(src.fileno(), dst.fileno(),
+                                         CHUNK_SIZE * 64):
+                    pass
+                return
+            except OSError:
+                pass
+
+    # shutil uses sendfile where available
+    shutil.copyfile(source, target)
+
 
 class SharedFile(object):
     def __init__(self, name):
@@ -85,25 +164,80 @@ class SharedFile(object):
                             "'{}': '{}' --> '{}'"
                             .format(self.name, p1, p2))
 
-    def export(self, output_dir=os.getcwd()):
+    def fingerprint(self):
+        """ Returns value identifying exported file content or None if
+        it can't be determined.
+        """
+        if self._content:
+            return ['content', self._executable,
+                    hashlib.sha256(self._content.encode()).hexdigest()]
+
+        sourcefile = self.abspath
+        if sourcefile:
+            try:
+                x = os.stat(sourcefile)
+            except OSError:
+                return None
+            return ['source', self._executable, sourcefile,
+                    x.st_size, x.st_mtime_ns]
+
+    def export(self, output_dir=os.getcwd(), manifest=None, link=False):
         target = os.path.join(output_dir, self._name)
+
+        fingerprint = None
+        if manifest is not None:
+            fingerprint = self.fingerprint()
+            if manifest.is_exported(target, fingerprint):
+                return
+
+        self.write(target, link=link)
+
+        if fingerprint is not None and os.path.exists(target):
+            manifest.set_exported(target, fingerprint)
+
+    def write(self, target, link=False):
+        """ Writes the file to target path. Target already having the
+        same size and content is left untouched. Source files are
+        hardlinked if link is set, unless this would change mode of the
+        source file.
+        """
         os.makedirs(os.path.dirname(target), exist_ok=True)
 
         if self._content:
-            with open(target, 'w') as f:
-                f.write(self._content)
+            data = self._content.encode()
+            if not _is_same_file(target, len(data),
+                                 lambda: hashlib.sha256(data).hexdigest()):
+                if os.path.lexists(target):
+                    os.unlink(target)
+                with open(target, 'wb') as f:
+                    f.write(data)
         else:
             sourcefile = self.abspath
             if sourcefile:
-                if os.path.exists(sourcefile):
-                    shutil.copyfile(sourcefile, target)
-                else:
+                if not os.path.exists(sourcefile):
                     raise Exception("Shared file '{}' not found"
                                     .format(sourcefile))
-
-        if os.path.exists(target):
-            if self._executable:
-                x = os.stat(target)
+                x = os.stat(sourcefile)
+                if self._executable and not x.st_mode & stat.S_IEXEC:
+                    link = False
+                linked = os.path.exists(target) \
+                    and os.path.samefile(sourcefile, target)
+                if linked and link:
+                    # Hardlink made by the previous export is kept
+                    pass
+                else:
+                    if linked or not _is_same_file(
+                            target, x.st_size,
+                            lambda: _file_digest(sourcefile),
+                            mtime_ns=x.st_mtime_ns):
+                        copy_file(sourcefile, target, link=link)
+                    # Copies get mtime of the source, so the next export
+                    # recognizes them without reading the content.
+                    os.utime(target, ns=(x.st_atime_ns, x.st_mtime_ns))
+
+        if self._executable and os.path.exists(target):
+            x = os.stat(target)
+            if not x.st_mode & stat.S_IEXEC:
                 os.chmod(target, x.st_mode | stat.S_IEXEC)
 
 
@@ -112,10 +246,42 @@ class SharedFiles(object):
         self.basedir = basedir or APPDATA['basedir']
         self.workdir = workdir or APPDATA['workdir']
         self._shared_files = {}
+        self._recorded = None
 
     def __getitem__(self, item):
+        if self._recorded is not None:
+            self._recorded.setdefault(item)
         return self._shared_files[item]
 
+    def __contains__(self, item):
+        if item not in self._shared_files:
+            return False
+        # Rule checking for a file depends on it as if it was registered
+        if self._recorded is not None:
+            self._recorded.setdefault(item)
+        return True
+
+    def start_recording(self):
+        """ Starts collecting names of files registered or accessed
+        until stop_recording() is called.
+        """
+        self._recorded = OrderedDict()
+
+    def stop_recording(self):
+        """ Returns shared files registered or accessed since the last
+        start_recording() call.
+        """
+        names, self._recorded = self._recorded, None
+        return [self._shared_files[name] for name in names or []]
+
+    def restore(self, shared_file):
+        """ Puts back shared file recorded during previous build. """
+        if shared_file.name in self._shared_files:
+            if shared_file._executable:
+                self._shared_files[shared_file.name].set_executable()
+            return
+        self._shared_files[shared_file.name] = shared_file
+
     def new(self, name, sourceref=None, content=None):
         shared_file = SharedFile(name)
 
@@ -140,15 +306,47 @@ class SharedFiles(object):
                                 .format(shared_file.filename))
 
         self._shared_files[shared_file.name] = shared_file
+        if self._recorded is not None:
+            self._recorded.setdefault(shared_file.name)
         return shared_file
 
+    def items(self):
+        return self._shared_files.items()
+
     def setdefault(self, shared_file):
         return self._shared_files.setdefault(shared_file.filename, shared_file)
 
-    def export(self, output_dir):
+    def export(self, output_dir, manifest=None, jobs=1, link=False):
+        """ Writes shared files to output_dir, by a pool of jobs threads.
+        Files exported by the previous conversion and unchanged since then
+        according to build manifest are skipped.
+        """
         if not os.path.isabs(output_dir):
             output_dir = os.path.abspath(
                 os.path.join(self.workdir, output_dir))
 
+        # Build manifest is consulted and updated by the calling thread only
+        pending = []
         for shared_file in self._shared_files.values():
-            shared_file.export(output_dir)
+            target = os.path.join(output_dir, shared_file.name)
+            fingerprint = None
+            if manifest is not None:
+                fingerprint = shared_file.fingerprint()
+                if manifest.is_exported(target, fingerprint):
+                    continue
+            pending.append((shared_file, target, fingerprint))
+
+        def write(item):
+            shared_file, target, _ = item
+            shared_file.write(target, link=link)
+
+        if jobs < 2 or len(pending) < 2:
+            for item in pending:
+                write(item)
+        else:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                list(executor.map(write, pending))
+
+        for _, target, fingerprint in pending:
+            if fingerprint is not None and os.path.exists(target):
+                manifest.set_exported(target, fingerprint)
@@ -1,5 +1,6 @@
 import os
 import json
+import shutil
 import yaml
 import lxml.etree as etree
 import textwrap
@@ -7,10 +8,20 @@ import tempfile
 import subprocess
 import traceback
 
-from lxml.isoschematron import Schematron
-
-from xccdf_yaml.appdata import APPDATA
-from xccdf_yaml.yaml import YamlLoader
+from concurrent.futures import ProcessPoolExecutor
+from xccdf_yaml.appdata import APPDATA, init_worker
+from xccdf_yaml.cache import BuildManifest, YamlCache
+from xccdf_yaml.datastream import compose_datastream, validate_datastream
+from xccdf_yaml.validators import (
+    get_datastream_schema_files,
+    get_schematron,
+    get_schematron_file,
+    get_xml_schema,
+    update_schematron,
+    validate_with_schemas,
+    NIST_SCHEMATRON_URL,
+)
+from xccdf_yaml.yaml import load_yaml
 from xccdf_yaml.xccdf.elements import XccdfGenerator
 
 from xccdf_yaml.xccdf.parsers import (
@@ -20,11 +31,16 @@ from xccdf_yaml.xccdf.parsers import (
 
 
 from jsonschema import validate
-from urllib.request import urlopen
+
+
+def _convert_worker(kwargs):
+    return XccdfYaml().convert(**kwargs)
 
 
 class XccdfYaml(object):
     def __init__(self, basedir=None, workdir=None):
+        self.manifest = None
+        self._benchmark_parser = None
         if basedir:
             self.basedir = basedir
         if workdir:
@@ -46,6 +62,24 @@ class XccdfYaml(object):
     def workdir(self, value):
         APPDATA['workdir'] = value
 
+    def setup_cache(self, no_cache=False, clear_cache=False):
+        cache = APPDATA['yaml_cache'] or YamlCache()
+        if clear_cache:
+            cache.clear()
+        if no_cache:
+            cache = None
+        APPDATA['yaml_cache'] = cache
+        return cache
+
+    def setup_jobs(self, jobs=1):
+        APPDATA['jobs'] = max(1, jobs or 1)
+
+    def setup_compression(self, compress_level=-1):
+        if compress_level < -1 or compress_level > 9:
+            raise Exception("Bad compression level {}, must be in range "
+                            "-1..9".format(compress_level))
+        APPDATA['compress_level'] = compress_level
+
     def _extend_oval(self, oval, result):
         oval.append_definition(result.definition)
         oval.extend_tests(result.tests)
@@ -54,19 +88,33 @@ class XccdfYaml(object):
         oval.append_variable(result.variable)
 
     def convert(self, filename=None, output_dir=None, output_basedir=None,
-                output_file=None, unescape=False, **kwargs):
+                output_file=None, unescape=False, no_cache=False,
+                clear_cache=False, jobs=1, stream=False, incremental=False,
+                compress_level=-1, link_files=False, **kwargs):
         self.basedir = os.path.dirname(filename)
+        self.setup_cache(no_cache=no_cache, clear_cache=clear_cache)
+        self.setup_jobs(jobs)
+        self.setup_compression(compress_level)
         generator = XccdfGenerator('mirantis.com')
-        data = yaml.load(open(filename), YamlLoader)
+        data = load_yaml(filename, lazy=stream)
+
+        if incremental:
+            self.manifest = BuildManifest(filename)
+            if clear_cache:
+                self.manifest.clear()
+            self.manifest.load()
 
         benchmark_file = None
         if 'benchmark' in data:
             parser = XccdfYamlBenchmarkParser(generator, self.basedir,
-                                              self.workdir)
+                                              self.workdir, streaming=stream,
+                                              manifest=self.manifest)
+            parser.filename = filename
             parser.parse(data['benchmark'])
             benchmark_file = parser.export(
                 output_basedir=output_basedir, output_dir=output_dir,
-                output_file=output_file)
+                output_file=output_file, link_files=link_files)
+            self._benchmark_parser = parser
 
         tailoring_file = None
         if 'tailoring' in data:
@@ -75,12 +123,72 @@ class XccdfYaml(object):
             parser.parse(data['tailoring'])
             tailoring_file = parser.export(
                 output_basedir=output_basedir, output_dir=output_dir,
-                output_file=output_file)
+                output_file=output_file, link_files=link_files)
 
         return benchmark_file, tailoring_file
 
+    def _load_batch_manifest(self, manifest):
+        """ Returns documents listed in batch manifest. Manifest is a YAML
+        list of file names or mappings with 'filename' key and convert
+        options (output-dir, output-file, ...). Relative file names are
+        resolved against manifest location.
+        """
+        with open(manifest) as f:
+            items = yaml.safe_load(f) or []
+
+        basedir = os.path.dirname(manifest)
+        entries = []
+        for item in items:
+            if isinstance(item, str):
+                item = {'filename': item}
+            entry = {}
+            for key, value in item.items():
+                entry[key.replace('-', '_')] = value
+            if 'filename' not in entry:
+                raise Exception("No filename in batch manifest item {}"
+                                .format(item))
+            entry['filename'] = os.path.join(basedir, entry['filename'])
+            entries.append(entry)
+        return entries
+
+    def convert_batch(self, filenames=None, batch_manifest=None, jobs=1,
+                      clear_cache=False, **kwargs):
+        """ Converts several documents in a single process, so loaded
+        templates, YAML cache and compiled schemas are shared. Documents
+        are distributed across worker processes if jobs > 1.
+
+        Returns list of (filename, benchmark_file, tailoring_file).
+        """
+        entries = [{'filename': x} for x in filenames or []]
+        if batch_manifest:
+            entries.extend(self._load_batch_manifest(batch_manifest))
+
+        # Caches are cleared once for the whole batch
+        self.setup_cache(no_cache=kwargs.get('no_cache', False),
+                         clear_cache=clear_cache)
+        tasks = []
+        for entry in entries:
+            task = dict(kwargs)
+            task.update(entry)
+            if clear_cache:
+                BuildManifest(task['filename']).clear()
+            tasks.append(task)
+
+        jobs = max(1, jobs or 1)
+        if jobs < 2 or len(tasks) < 2:
+            results = [self.convert(jobs=jobs, **task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=jobs,
+                                     initializer=init_worker,
+                                     initargs=(APPDATA.copy(),)) as executor:
+                results = list(executor.map(_convert_worker, tasks))
+
+        return [(task['filename'], ) + tuple(result)
+                for task, result in zip(tasks, results)]
+
     def validate(self, filename=None, schema_type='auto', schema='',
-                 skip_valid=False, **kwargs):
+                 skip_valid=False, no_cache=False, clear_cache=False,
+                 jobs=1, **kwargs):
         self.basedir = os.path.dirname(filename)
 
         if schema_type == 'auto':
@@ -102,7 +210,9 @@ class XccdfYaml(object):
                 schema = yaml.load(open(schema))
 
             try:
-                data = yaml.load(open(filename), YamlLoader)
+                self.setup_cache(no_cache=no_cache, clear_cache=clear_cache)
+                self.setup_jobs(jobs)
+                data = load_yaml(filename)
                 validate(data, schema)
             except: # noqa
                 traceback.print_exc()
@@ -111,9 +221,7 @@ class XccdfYaml(object):
             return
 
         if schema_type == 'xml':
-            with open(schema) as f:
-                schema_root = etree.parse(f)
-                schema_doc = etree.XMLSchema(schema_root)
+            schema_doc = get_xml_schema(schema)
 
             with open(filename) as f:
                 benchmark = etree.parse(f)
@@ -139,9 +247,12 @@ class XccdfYaml(object):
         raise Exception("Bad schema type '{}'".format(schema_type))
 
     def load(self, filename=None, format='', pretty=False, indent=2,
-             output=None, **kwargs):
+             output=None, no_cache=False, clear_cache=False, jobs=1,
+             **kwargs):
         self.basedir = os.path.dirname(filename)
-        data = yaml.load(open(filename), YamlLoader)
+        self.setup_cache(no_cache=no_cache, clear_cache=clear_cache)
+        self.setup_jobs(jobs)
+        data = load_yaml(filename)
 
         result = None
         if format == 'json':
@@ -171,13 +282,8 @@ class XccdfYaml(object):
         self.basedir = os.path.dirname(filename)
 
         if schematron_file is None:
-            schema_doc = etree.parse(urlopen(
-                'https://csrc.nist.gov/schema/xccdf/1.2/xccdf_1.2.sch'))
-        else:
-            with open(schematron_file) as f:
-                schema_doc = etree.parse(f)
-
-        schema = Schematron(schema_doc, store_report=True)
+            schematron_file = get_schematron_file()
+        schema = get_schematron(schematron_file)
 
         with open(filename) as f:
             benchmark = etree.parse(f)
@@ -203,17 +309,80 @@ class XccdfYaml(object):
 
             raise Exception("Schematron validation failed")
 
+    def schematron_update(self, url=NIST_SCHEMATRON_URL, filename=None,
+                          **kwargs):
+        path = update_schematron(url=url, filename=filename)
+        print("Schematron {} saved to {}".format(filename or url, path))
+        return path
+
     def datastream(self, filename=None, skip_valid=False, output_file=None,
-                   **kwargs):
+                   oscap=False, scap_version='1.3', **kwargs):
         self.basedir = os.path.dirname(filename)
 
+        if output_file is None:
+            output_file = "{}-ds.xml".format(
+                filename.rsplit('.', maxsplit=1)[0])
+
+        if oscap:
+            return self._oscap_datastream(filename, skip_valid=skip_valid,
+                                          output_file=output_file)
+
+        # Benchmark converted by this instance provides shared files,
+        # otherwise they are looked up by XCCDF check references.
+        parser = self._benchmark_parser
+        if parser is not None and parser.output_file == filename:
+            output_file = parser.export_datastream(
+                output_file=output_file, scap_version=scap_version)
+        else:
+            output_file = compose_datastream(filename, output_file,
+                                             scap_version=scap_version)
+
+        if not skip_valid:
+            self._validate_datastream(output_file, scap_version)
+
+        print("Source datastream: {}".format(output_file))
+
+        return output_file
+
+    def _validate_datastream(self, filename, scap_version='1.3'):
+        """ Validates source data stream against SCAP schemas if they are
+        installed, otherwise with oscap.
+        """
+        errors = validate_datastream(filename)
+        if not errors:
+            schemas = get_datastream_schema_files(scap_version)
+            if schemas is not None:
+                errors = validate_with_schemas(filename, *schemas)
+            elif shutil.which('oscap'):
+                errors = self._oscap_validate_datastream(filename)
+            else:
+                raise Exception("Unable to validate {}: SCAP {} source data "
+                                "stream schemas are not installed and oscap "
+                                "is not available, use --skip-valid to skip "
+                                "validation".format(filename, scap_version))
+
+        if errors:
+            print("Source datastream validation errors:")
+            for error in errors:
+                print('---')
+                print(error)
+            print('---')
+            raise Exception("Source datastream validation failed")
+
+    def _oscap_validate_datastream(self, filename):
+        cmd = ['oscap', 'ds', 'sds-validate', filename]
+        try:
+            subprocess.check_output(cmd, stderr=subprocess.STDOUT)
+        except subprocess.CalledProcessError as e:
+            return [e.output.decode().strip()]
+        return []
+
+    def _oscap_datastream(self, filename, skip_valid=False,
+                          output_file=None):
         cmd = ['oscap', 'ds', 'sds-compose']
         if skip_valid:
             cmd.append('--skip-valid')
         cmd.append(filename)
-        if output_file is None:
-            output_file = "{}-ds.xml".format(
-                filename.rsplit('.', maxsplit=1)[0])
         cmd.append(output_file)
 
         stderr_fd, stderr_filename = tempfile.mkstemp()
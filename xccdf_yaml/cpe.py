@@ -1,5 +1,12 @@
 import cpe
 
+# Affected platform names keyed by CPE string, parsing CPE is slow and
+# the same few platforms are referenced by every rule.
+_affected = {}
+
+# Marks CPE strings not parsed yet, parsing may produce None as well
+_missing = object()
+
 
 def get_affected_from_cpe(cpe_string):
     """ Returns string formatted for using in the platform -> affected
@@ -26,6 +33,19 @@ def get_affected_from_cpe(cpe_string):
     >>> print(get_affected_from_cpe('cpe:/o:suse:linux_enterprise_server:11'))
     >>> SUSE Linux Enterprise 11
     """
+    affected_string = _affected.get(cpe_string, _missing)
+    if affected_string is _missing:
+        affected_string = _affected[cpe_string] = \
+            _parse_affected(cpe_string)
+    return affected_string
+
+
+def is_cpe(platform):
+    """ Returns True if platform is a CPE name (URI or formatted string) """
+    return platform.startswith('cpe:')
+
+
+def _parse_affected(cpe_string):
     __products_version_exclude__ = ['leap']
     __mapping__ = {
         'redhat': {
@@ -51,3 +71,37 @@ def get_affected_from_cpe(cpe_string):
     version = cpeobject.get_version()[0].replace('.', '')
     affected_string = '{} {}'.format(affected_string, version)
     return affected_string
+
+
+class PlatformTable(object):
+    """ OVAL affected platform names by benchmark platform, sorted by
+    platform. Names are resolved when looked up first. Platforms which
+    are not CPE names are skipped, looking them up returns them as is.
+    """
+    def __init__(self, platforms):
+        self._platforms = platforms
+        self._names = {}
+
+    def __iter__(self):
+        for platform in sorted(self._platforms):
+            if is_cpe(platform):
+                yield platform
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, platform):
+        return platform in self._platforms and is_cpe(platform)
+
+    def __getitem__(self, platform):
+        name = self._names.get(platform, _missing)
+        if name is _missing:
+            if is_cpe(platform):
+                name = get_affected_from_cpe(platform)
+            else:
+                name = platform
+            self._names[platform] = name
+        return name
+
+    def items(self):
+        return [(x, self[x]) for x in self]
@@ -0,0 +1,284 @@
+import datetime
+import os
+import re
+
+import lxml.etree as etree
+from collections import OrderedDict
+from xccdf_yaml.xml import (
+    FileContent,
+    XmlCommon,
+    XmlFragment,
+    XmlWriter,
+    qname,
+)
+
+NSMAP = {
+    'ds': "http://scap.nist.gov/schema/scap/source/1.2",
+    'xlink': "http://www.w3.org/1999/xlink",
+    'cat': "urn:oasis:names:tc:entity:xmlns:xml:catalog",
+}
+
+SCE_STREAM_NSMAP = {
+    'oscap-sce-xccdf-stream': "http://open-scap.org/page/SCE_xccdf_stream",
+}
+
+OVAL_DEFINITIONS = \
+    "{http://oval.mitre.org/XMLSchema/oval-definitions-5}oval_definitions"
+
+# Id prefix used by oscap for composed data streams
+ID_PREFIX = 'scap_org.open-scap'
+
+# Characters not allowed in XML 1.0 documents
+re_xml_invalid = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def _id(kind, name):
+    return '{}_{}_{}'.format(ID_PREFIX, kind, re.sub(r'[^\w\-\.]', '-', name))
+
+
+def _timestamp():
+    return datetime.datetime.now().replace(microsecond=0).isoformat()
+
+
+def _read_text(path):
+    """ Returns file content if it is UTF-8 text which can be put into XML
+    document, otherwise None.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    try:
+        content = data.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+    if re_xml_invalid.search(content):
+        return None
+    return content
+
+
+def _root_tag(path):
+    """ Returns tag of the root element of XML file without parsing the
+    whole document, or None if file isn't an XML document.
+    """
+    try:
+        for _, element in etree.iterparse(path, events=('start', )):
+            return element.tag
+    except etree.XMLSyntaxError:
+        return None
+
+
+class DsElement(XmlCommon):
+    __slots__ = ()
+
+    def __init__(self, name, ns='ds', nsmap=None):
+        super().__init__(name, ns=ns, nsmap=nsmap or NSMAP)
+
+    def set_href(self, href):
+        return self.set_attr(qname(NSMAP['xlink'], 'href'), href)
+
+
+class DsComponentElement(DsElement):
+    """ ds:component holding content of an XML document written before.
+    Document is copied to the output without being parsed.
+    """
+    __stream__ = True
+    __slots__ = ()
+
+    def __init__(self, id, path, name='component'):
+        super().__init__(name)
+        self.set_attr('id', id)
+        self.set_attr('timestamp', _timestamp())
+        self.append(XmlFragment(os.path.basename(path), FileContent(path), 2))
+
+
+class DsExtendedComponentElement(DsElement):
+    """ ds:extended-component holding SCE script the same way as oscap
+    does, so scripts are available when the data stream is evaluated.
+    """
+    __slots__ = ()
+
+    def __init__(self, id, content):
+        super().__init__('extended-component')
+        self.set_attr('id', id)
+        self.set_attr('timestamp', _timestamp())
+        script = XmlCommon('script', ns='oscap-sce-xccdf-stream',
+                           nsmap=SCE_STREAM_NSMAP)
+        self.append(script.set_text(content))
+
+
+class DsDataStreamCollection(DsElement):
+    """ SCAP source data stream collection for the single XCCDF document.
+
+    XCCDF and OVAL documents are referenced as checklists and checks,
+    other files (SCE scripts and their shared files) are added as
+    extended components and listed in the XCCDF component-ref catalog.
+    Extended components hold script text, so binary files are skipped and
+    their names are kept in skipped.
+    """
+    __stream__ = True
+    __slots__ = ('_datastream', '_checklists', '_checks', '_extended',
+                 '_components', '_extended_components', '_xccdf_ref',
+                 '_catalog', 'skipped')
+
+    def __init__(self, xccdf_file, scap_version='1.3'):
+        super().__init__('data-stream-collection')
+        name = os.path.basename(xccdf_file)
+        self.set_attr('id', _id('collection_from_xccdf', name))
+        self.set_attr('schematron-version', scap_version)
+
+        self._datastream = self.sub_element('data-stream')\
+            .set_attr('id', _id('datastream_from_xccdf', name))\
+            .set_attr('scap-version', scap_version)\
+            .set_attr('use-case', 'OTHER')
+        self._checklists = self._datastream.sub_element('checklists')
+        self._checks = None
+        self._extended = None
+        self._components = []
+        self._extended_components = []
+
+        self._xccdf_ref = self._component_ref(self._checklists, name)
+        self._catalog = None
+        self.skipped = []
+        self._components.append(
+            DsComponentElement(_id('comp', name), xccdf_file))
+
+    def _component_ref(self, parent, name, prefix='comp'):
+        ref = DsElement('component-ref')\
+            .set_attr('id', _id('cref', name))\
+            .set_href('#{}'.format(_id(prefix, name)))
+        parent.append(ref)
+        return ref
+
+    def _add_to_catalog(self, name):
+        if self._catalog is None:
+            self._catalog = self._xccdf_ref.append(DsElement('catalog', 'cat'))
+        self._catalog.append(DsElement('uri', 'cat')
+                             .set_attr('name', name)
+                             .set_attr('uri', '#{}'.format(_id('cref', name))))
+
+    def add_file(self, name, path=None, content=None):
+        """ Adds file referenced from XCCDF checks by name. OVAL documents
+        become checks components, other text files extended components.
+        """
+        if content is None and _root_tag(path) == OVAL_DEFINITIONS:
+            self.changed()
+            if self._checks is None:
+                self._checks = DsElement('checks')
+                self._datastream.append(self._checks)
+            self._component_ref(self._checks, name)
+            self._components.append(DsComponentElement(_id('comp', name),
+                                                       path))
+            self._add_to_catalog(name)
+            return self
+
+        if content is None:
+            content = _read_text(path)
+            if content is None:
+                self.skipped.append(name)
+                return self
+
+        self.changed()
+        if self._extended is None:
+            self._extended = DsElement('extended-components')
+        self._component_ref(self._extended, name, prefix='ecomp')
+        self._extended_components.append(
+            DsExtendedComponentElement(_id('ecomp', name), content))
+        self._add_to_catalog(name)
+        return self
+
+    def update_elements(self):
+        self._datastream.remove_elements(name='extended-components')
+        if self._extended is not None:
+            self._datastream.append(self._extended)
+
+        self.remove_elements(name='component')
+        self.remove_elements(name='extended-component')
+        for x in self._components:
+            self.append(x)
+        for x in self._extended_components:
+            self.append(x)
+
+
+def xccdf_check_refs(xccdf_file):
+    """ Returns names of files referenced by checks of the XCCDF document """
+    refs = OrderedDict()
+    tag = '{http://checklists.nist.gov/xccdf/1.2}check-content-ref'
+    for _, element in etree.iterparse(xccdf_file, tag=tag):
+        refs.setdefault(element.get('href'))
+        element.clear()
+    return list(refs)
+
+
+def validate_datastream(path):
+    """ Returns list of errors found in source data stream: document must
+    be well-formed, contain data stream collection and every component
+    reference must point to a component of the collection.
+    """
+    ds = NSMAP['ds']
+    component_tags = (qname(ds, 'component'),
+                      qname(ds, 'extended-component'))
+    ref_tag = qname(ds, 'component-ref')
+    components = set()
+    refs = []
+    root = None
+    try:
+        for event, element in etree.iterparse(path, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = element.tag
+                continue
+            if element.tag in component_tags:
+                components.add(element.get('id'))
+                # Component content isn't needed once its id is taken
+                element.clear()
+            elif element.tag == ref_tag:
+                refs.append(element.get(qname(NSMAP['xlink'], 'href')))
+    except etree.XMLSyntaxError as e:
+        return [str(e)]
+
+    errors = []
+    if root != qname(ds, 'data-stream-collection'):
+        errors.append("Root element {} is not data-stream-collection"
+                      .format(root))
+    for href in refs:
+        if not href or not href.startswith('#') or \
+                href[1:] not in components:
+            errors.append("Component reference '{}' points to no component"
+                          .format(href))
+    return errors
+
+
+def compose_datastream(xccdf_file, output_file, shared_files=None,
+                       scap_version='1.3'):
+    """ Writes source data stream composed of XCCDF document and files it
+    refers to. Files are taken from shared_files if given, otherwise
+    files referenced by XCCDF checks are read from the XCCDF directory.
+    """
+    collection = DsDataStreamCollection(xccdf_file,
+                                        scap_version=scap_version)
+    xccdf_dir = os.path.dirname(xccdf_file)
+
+    if shared_files is None:
+        for name in xccdf_check_refs(xccdf_file):
+            path = os.path.join(xccdf_dir, name)
+            if not os.path.exists(path):
+                raise Exception("File '{}' referenced by '{}' not found"
+                                .format(name, xccdf_file))
+            collection.add_file(name, path=path)
+    else:
+        for name, shared_file in shared_files.items():
+            if shared_file.content:
+                collection.add_file(name, content=shared_file.content)
+            else:
+                collection.add_file(name,
+                                    path=os.path.join(xccdf_dir, name))
+
+    for name in collection.skipped:
+        print("Binary file {} can't be put into the data stream, skipped"
+              .format(name))
+
+    with open(output_file, 'wb') as f:
+        writer = XmlWriter(f)
+        writer.write_declaration()
+        writer.write(collection)
+
+    return output_file
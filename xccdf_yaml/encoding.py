@@ -0,0 +1,60 @@
+import base64
+import zlib
+
+from concurrent.futures import ThreadPoolExecutor
+
+# Encoded code is split to lines of this width
+LINE_WIDTH = 120
+
+
+def wrap(text, width=LINE_WIDTH):
+    """ Returns text split to lines of given width. The result is the same
+    as of textwrap.fill() for text without whitespaces, like base64.
+    """
+    return '\n'.join(text[i:i + width] for i in range(0, len(text), width))
+
+
+def encode_code(code, compress=True, level=zlib.Z_DEFAULT_COMPRESSION):
+    """ Returns code encoded for XCCDF value: base64 of (optionally zlib
+    compressed) code, wrapped to LINE_WIDTH columns.
+    """
+    data = code.encode()
+    if compress:
+        data = zlib.compress(data, level)
+    return wrap(base64.b64encode(data).decode())
+
+
+class CodeEncoder(object):
+    """ Sets encoded code to XCCDF values.
+
+    With jobs > 1 values are collected until flush(), then all of them are
+    encoded by a thread pool (zlib releases the GIL while compressing).
+    Otherwise values are encoded right away.
+    """
+    def __init__(self, jobs=1, level=zlib.Z_DEFAULT_COMPRESSION):
+        self.jobs = jobs
+        self.level = level
+        self._pending = []
+
+    def _encode(self, item):
+        _, code, compress, _ = item
+        return encode_code(code, compress=compress, level=self.level)
+
+    def add(self, value, code, compress=True, selector=None):
+        item = (value, code, compress, selector)
+        if self.jobs < 2:
+            value.set_value(self._encode(item), selector=selector)
+        else:
+            self._pending.append(item)
+        return value
+
+    def flush(self):
+        pending, self._pending = self._pending, []
+        if len(pending) < 2:
+            results = [self._encode(x) for x in pending]
+        else:
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                results = list(executor.map(self._encode, pending))
+
+        for (value, _, _, selector), text in zip(pending, results):
+            value.set_value(text, selector=selector)
@@ -1,19 +1,51 @@
+import copy
+
+from collections import OrderedDict
 from html import escape
 from lxml.html import builder
 import lxml.etree as etree
 import markdown
 
+from xccdf_yaml.xml import qname
+
+# Maximum number of rendered texts kept by the process
+MAX_CACHED = 1024
+
+_cache = OrderedDict()
+_markdown = None
+
+
+def _converter():
+    global _markdown
+    if _markdown is None:
+        _markdown = markdown.Markdown()
+    return _markdown.reset()
+
 
 class MarkdownHtml(object):
     def __init__(self, text, plaintext=False):
         self.text = text
-        if plaintext:
-            self.html = builder.HTML(builder.BODY(builder.CODE(self.text)))
-        else:
-            self.html = etree.HTML(markdown.markdown(self.text))
         self.ns = 'xhtml'
         self.nsmap = {'xhtml': 'http://www.w3.org/1999/xhtml'}
-        self.html = self.set_default_ns(self.html, default_ns=self.ns)
+        self.html = self._render(plaintext)
+
+    def _render(self, plaintext):
+        """ Returns XHTML tree of the text. Trees are cached by (text,
+        plaintext), every instance gets its own copy as xml() moves
+        elements into the output document.
+        """
+        key = (self.text, plaintext)
+        html = _cache.pop(key, None)
+        if html is None:
+            if plaintext:
+                html = builder.HTML(builder.BODY(builder.CODE(self.text)))
+            else:
+                html = etree.HTML(_converter().convert(self.text))
+            html = self.set_default_ns(html, default_ns=self.ns)
+            while len(_cache) >= MAX_CACHED:
+                _cache.popitem(last=False)
+        _cache[key] = html
+        return copy.deepcopy(html)
 
     def escape(self, text):
         if text:
@@ -21,15 +53,23 @@ class MarkdownHtml(object):
         return text
 
     def set_default_ns(self, element, default_ns=None):
-        e = etree.Element(etree.QName(self.nsmap[default_ns], element.tag),
-                          nsmap=self.nsmap)
-        for item in element:
-            e.append(self.set_default_ns(item, default_ns))
+        """ Returns copy of the root element in default_ns namespace.
+        Descendants are moved into the new root and renamed in place.
+        """
+        uri = self.nsmap[default_ns]
+        root = etree.Element(qname(uri, element.tag), nsmap=self.nsmap)
         for key, value in element.attrib.items():
-            e.attrib[key] = value
-        e.text = self.escape(element.text)
-        e.tail = self.escape(element.tail)
-        return e
+            root.attrib[key] = value
+        root.text = self.escape(element.text)
+        root.tail = self.escape(element.tail)
+        root.extend(element)
+        for e in root.iterdescendants():
+            # Comments and processing instructions keep their text
+            if isinstance(e.tag, str):
+                e.tag = qname(uri, e.tag)
+                e.text = self.escape(e.text)
+            e.tail = self.escape(e.tail)
+        return root
 
     def xml(self):
         elements = self.html.xpath(
@@ -1,3 +1,4 @@
+import abc
 import re
 
 from copy import deepcopy
@@ -38,8 +39,17 @@ def deepmerge(left, right, deep_copy=False):
     return right
 
 
+class LazySequence(abc.ABC):
+    """ Base class for sequences which produce items on iteration only.
+    unlist() flattens them the same way as lists.
+    """
+    @abc.abstractmethod
+    def __iter__(self):
+        pass
+
+
 def unlist(seq):
-    if isinstance(seq, list):
+    if isinstance(seq, (list, LazySequence)):
         for x in seq:
             for y in unlist(x):
                 yield y
@@ -14,11 +14,14 @@ NSMAP = {
 
 
 class XmlBase(XmlCommon):
+    __slots__ = ()
+
     def __init__(self, name, ns=None):
         super().__init__(name, ns=ns, nsmap=NSMAP)
 
 
 class OvalDefinitions(XmlBase):
+    __stream__ = True
     __elements_order__ = (
         'generator',
         'definitions',
@@ -27,6 +30,7 @@ class OvalDefinitions(XmlBase):
         'states',
         'variables'
     )
+    __slots__ = ('_definitions', '_tests', '_objects', '_states', '_variables')
 
     def __init__(self):
         super().__init__('oval_definitions')
@@ -44,38 +48,47 @@ class OvalDefinitions(XmlBase):
                         self._objects, self._states])
 
     def add_definition(self, id):
+        self.changed()
         return self._definitions.setdefault(id, Definition(id))
 
     def add_test(self, name, ns=None):
+        self.changed()
         return self._tests.setdefault(name, OvalTest(name, ns))
 
     def add_object(self, id, name, ns=None):
+        self.changed()
         return self._objects.setdefault(id, OvalObject(id, name, ns))
 
     def add_state(self, id, name, ns=None):
+        self.changed()
         return self._states.setdefault(id, OvalState(id, name, ns))
 
     def append_definition(self, item):
+        self.changed()
         if item:
             self._definitions.setdefault(item.get_attr('id'), item)
         return self
 
     def append_test(self, item):
+        self.changed()
         if item:
             self._tests.setdefault(item.get_attr('id'), item)
         return self
 
     def append_object(self, item):
+        self.changed()
         if item:
             self._objects.setdefault(item.get_attr('id'), item)
         return self
 
     def append_state(self, item):
+        self.changed()
         if item:
             self._states.setdefault(item.get_attr('id'), item)
         return self
 
     def append_variable(self, item):
+        self.changed()
         if item:
             self._variables.setdefault(item.get_attr('id'), item)
         return self
@@ -144,6 +157,7 @@ class OvalGenerator(XmlBase):
         'schema_version',
         'timestamp',
     )
+    __slots__ = ()
 
     def __init__(self):
         super().__init__('generator')
@@ -163,6 +177,7 @@ class ExternalVariable(XmlBase):
         'id',
         'version'
     )
+    __slots__ = ()
 
     def __init__(self, id, datatype, version='1', comment=None):
         super().__init__('external_variable')
@@ -178,6 +193,7 @@ class Definition(XmlBase):
         'metadata',
         'criteria',
     )
+    __slots__ = ('_metadata', '_criteria')
 
     def __init__(self, id, version='1', class_name='compliance'):
         super().__init__('definition')
@@ -188,11 +204,13 @@ class Definition(XmlBase):
         self._criteria = []
 
     def add_metadata(self):
+        self.changed()
         metadata = Metadata()
         self._metadata = metadata
         return metadata
 
     def add_criteria(self, operator='OR'):
+        self.changed()
         criteria = Criteria(operator=operator)
         self._criteria.append(criteria)
         return criteria
@@ -213,6 +231,7 @@ class Metadata(XmlBase):
         'affected',
         'description',
     )
+    __slots__ = ()
 
     def __init__(self):
         super().__init__('metadata')
@@ -242,6 +261,8 @@ class Metadata(XmlBase):
 
 
 class Criteria(XmlBase):
+    __slots__ = ('_criterion', '_criteria')
+
     def __init__(self, operator='OR'):
         super().__init__('criteria')
         self.set_attr('operator', operator)
@@ -249,15 +270,18 @@ class Criteria(XmlBase):
         self._criteria = []
 
     def add_criterion(self, instance):
+        self.changed()
         self._criterion.append(instance)
         return instance
 
     def new_criterion(self, test_ref):
+        self.changed()
         criterion = Criterion(test_ref=test_ref)
         self._criterion.append(criterion)
         return criterion
 
     def add_criteria(self, instance):
+        self.changed()
         self._criteria.append(instance)
         return instance
 
@@ -271,12 +295,16 @@ class Criteria(XmlBase):
 
 
 class Criterion(XmlBase):
+    __slots__ = ()
+
     def __init__(self, test_ref):
         super().__init__('criterion')
         self.set_attr('test_ref', test_ref)
 
 
 class OvalTest(XmlBase):
+    __slots__ = ('_objects', '_states')
+
     def __init__(self, id, name, check='all', check_existence='all_exist',
                  version='1', ns=None):
         super().__init__(name, ns=ns)
@@ -292,9 +320,11 @@ class OvalTest(XmlBase):
         self._states = set()
 
     def add_object(self, instance):
+        self.changed()
         self._objects.add(instance)
 
     def add_state(self, instance):
+        self.changed()
         self._states.add(instance)
 
     def update_elements(self):
@@ -310,6 +340,8 @@ class OvalTest(XmlBase):
 
 
 class OvalObject(XmlBase):
+    __slots__ = ()
+
     def __init__(self, id, name, ns=None, version='1'):
         super().__init__(name, ns=ns)
         self.set_attrs({
@@ -319,6 +351,8 @@ class OvalObject(XmlBase):
 
 
 class OvalState(XmlBase):
+    __slots__ = ()
+
     def __init__(self, id, name, ns=None, version='1'):
         super().__init__(name, ns=ns)
         self.set_attrs({
@@ -1,16 +1,14 @@
-from xccdf_yaml.oval.parsers.dpkginfo import DpkginfoParser
-from xccdf_yaml.oval.parsers.file import FileParser
-from xccdf_yaml.oval.parsers.sysctl import SysctlParser
-from xccdf_yaml.oval.parsers.textfilecontent import TextfilecontentParser
-from xccdf_yaml.oval.parsers.systemd import SystemdParser
-from xccdf_yaml.oval.parsers.inetlisteningservers import InetlisteningserversParser
+from xccdf_yaml.registry import ParserRegistry, OVAL_PARSERS_GROUP
 
 
-PARSERS = {
-    'pkg': DpkginfoParser,
-    'file': FileParser,
-    'pattern_match': TextfilecontentParser,
-    'sysctl': SysctlParser,
-    'systemd': SystemdParser,
-    'listen': InetlisteningserversParser,
-}
+PARSERS = ParserRegistry(OVAL_PARSERS_GROUP, {
+    'pkg': 'xccdf_yaml.oval.parsers.dpkginfo:DpkginfoParser',
+    'file': 'xccdf_yaml.oval.parsers.file:FileParser',
+    'pattern_match':
+        'xccdf_yaml.oval.parsers.textfilecontent:TextfilecontentParser',
+    'sysctl': 'xccdf_yaml.oval.parsers.sysctl:SysctlParser',
+    'systemd': 'xccdf_yaml.oval.parsers.systemd:SystemdParser',
+    'listen':
+        'xccdf_yaml.oval.parsers.inetlisteningservers:'
+        'InetlisteningserversParser',
+})
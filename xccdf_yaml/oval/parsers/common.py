@@ -3,11 +3,12 @@ from xccdf_yaml.common import SharedFiles
 
 class GenericParser(object):
     def __init__(self, generator, benchmark, parsed_args=None,
-                 shared_files=None):
+                 shared_files=None, encoder=None):
         self.generator = generator
         self.benchmark = benchmark
         self.parsed_args = parsed_args
         self.shared_files = shared_files
+        self.encoder = encoder
 
     @property
     def xccdf(self):
@@ -58,6 +59,9 @@ class GenericParser(object):
 
         return result
 
+    def finalize(self):
+        """ Completes work deferred by parse() calls made so far """
+
 
 class ParsedObjects(object):
     def __init__(self, xccdf):
@@ -7,7 +7,6 @@ from xccdf_yaml.oval.elements import OvalTest
 from xccdf_yaml.oval.elements import OvalState
 from xccdf_yaml.oval.elements import Criterion
 # from xccdf_yaml.oval import Metadata
-from xccdf_yaml.cpe import get_affected_from_cpe
 
 
 class FileParser(GenericParser):
@@ -68,12 +67,12 @@ class FileParser(GenericParser):
                 # State
                 state = OvalState('oval:{}_mode_{}:ste:1'.format(id, idx),
                                   'file_state', ns=self.__ns__)
-                state.__elements_order__ = (
+                state.set_elements_order((
                     'suid', 'sgid', 'sticky',
                     'uread', 'uwrite', 'uexec',
                     'gread', 'gwrite', 'gexec',
                     'oread', 'owrite', 'oexec',
-                )
+                ))
                 for k, v in modes.items():
                     state.sub_element(k)\
                         .set_text(v)\
@@ -84,10 +83,10 @@ class FileParser(GenericParser):
                 # Test
                 test = OvalTest('oval:{}_mode_{}:tst:1'.format(id, idx),
                                 'file_test', ns=self.__ns__)
-                test.__elements_order__ = (
+                test.set_elements_order((
                     'object',
                     'state',
-                )
+                ))
                 test.add_object(obj)
                 test.add_state(state)
                 res.tests.append(test)
@@ -112,10 +111,10 @@ class FileParser(GenericParser):
                 # Test
                 test = OvalTest('oval:{}_uid_{}:tst:1'.format(id, idx),
                                 'file_test', ns=self.__ns__)
-                test.__elements_order__ = (
+                test.set_elements_order((
                     'object',
                     'state',
-                )
+                ))
                 test.add_object(obj)
                 test.add_state(state)
                 res.tests.append(test)
@@ -138,10 +137,10 @@ class FileParser(GenericParser):
                 # Test
                 test = OvalTest('oval:{}_gid_{}:tst:1'.format(id, idx),
                                 'file_test', ns=self.__ns__)
-                test.__elements_order__ = (
+                test.set_elements_order((
                     'object',
                     'state',
-                )
+                ))
                 test.add_object(obj)
                 test.add_state(state)
                 res.tests.append(test)
@@ -152,11 +151,12 @@ class FileParser(GenericParser):
         metadata = definition.add_metadata()
         metadata.set_title(str(id))
         metadata.set_description('Check for {}'.format(id))
+        platform_table = self.benchmark.platform_table
         if isinstance(affected, list):
             for affect in affected:
-                metadata.set_affected('unix', get_affected_from_cpe(affect))
+                metadata.set_affected('unix', platform_table[affect])
         else:
-            metadata.set_affected('unix', get_affected_from_cpe(affected))
+            metadata.set_affected('unix', platform_table[affected])
 
         criteria = definition.add_criteria()
         for test in res.tests:
@@ -7,7 +7,6 @@ from xccdf_yaml.oval.elements import OvalState
 from xccdf_yaml.oval.elements import OvalTest
 from xccdf_yaml.oval.elements import Criterion
 from xccdf_yaml.oval.elements import ExternalVariable
-from xccdf_yaml.cpe import get_affected_from_cpe
 
 
 class InetlisteningserversParser(GenericParser):
@@ -68,7 +67,7 @@ class InetlisteningserversParser(GenericParser):
             any_listen_obj = OvalObject(
                 'oval:{}_listen_any:obj:1'.format(id),
                 'inetlisteningservers_object', ns=self.__ns__)
-            any_listen_obj.__elements_order__ = elements_order
+            any_listen_obj.set_elements_order(elements_order)
 
             any_listen_obj.sub_element('protocol')\
                 .set_text(protocol)
@@ -82,7 +81,7 @@ class InetlisteningserversParser(GenericParser):
 
         obj = OvalObject('oval:{}:obj:1'.format(id),
                          'inetlisteningservers_object', ns=self.__ns__)
-        obj.__elements_order__ = elements_order
+        obj.set_elements_order(elements_order)
 
         obj.sub_element('protocol')\
             .set_text(protocol)
@@ -110,7 +109,7 @@ class InetlisteningserversParser(GenericParser):
         # State
         state = OvalState('oval:{}:ste:1'.format(id),
                           'inetlisteningservers_state', ns=self.__ns__)
-        state.__elements_order__ = elements_order
+        state.set_elements_order(elements_order)
 
         if program:
             state.sub_element('program_name')\
@@ -142,10 +141,10 @@ class InetlisteningserversParser(GenericParser):
         test = OvalTest('oval:{}:tst:1'.format(id),
                         'inetlisteningservers_test', ns=self.__ns__)
 
-        test.__elements_order__ = (
+        test.set_elements_order((
             'object',
             'state',
-        )
+        ))
         test.set_attr('check', 'at least one')
         test.add_object(obj)
         test.add_state(state)
@@ -162,11 +161,12 @@ class InetlisteningserversParser(GenericParser):
         metadata = definition.add_metadata()
         metadata.set_title(str(id))
         metadata.set_description('Check for {}'.format(id))
+        platform_table = self.benchmark.platform_table
         if isinstance(affected, list):
             for affect in affected:
-                metadata.set_affected('unix', get_affected_from_cpe(affect))
+                metadata.set_affected('unix', platform_table[affect])
         else:
-            metadata.set_affected('unix', get_affected_from_cpe(affected))
+            metadata.set_affected('unix', platform_table[affected])
 
         if listen and address not in ['all', 'any', '0.0.0.0', '*'] \
                 and not variable:
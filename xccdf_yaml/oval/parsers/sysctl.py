@@ -7,7 +7,6 @@ from xccdf_yaml.oval.elements import OvalTest
 from xccdf_yaml.oval.elements import OvalState
 from xccdf_yaml.oval.elements import Criterion
 # from xccdf_yaml.oval import Metadata
-from xccdf_yaml.cpe import get_affected_from_cpe
 
 
 class SysctlParser(GenericParser):
@@ -49,11 +48,12 @@ class SysctlParser(GenericParser):
         metadata = definition.add_metadata()
         metadata.set_title(str(id))
         metadata.set_description('Check for {}'.format(id))
+        platform_table = self.benchmark.platform_table
         if isinstance(affected, list):
             for affect in affected:
-                metadata.set_affected('unix', get_affected_from_cpe(affect))
+                metadata.set_affected('unix', platform_table[affect])
         else:
-            metadata.set_affected('unix', get_affected_from_cpe(affected))
+            metadata.set_affected('unix', platform_table[affected])
 
         criteria = definition.add_criteria()
         for test in res.tests:
@@ -7,7 +7,6 @@ from xccdf_yaml.oval.elements import OvalTest
 from xccdf_yaml.oval.elements import OvalState
 from xccdf_yaml.oval.elements import Criterion
 from xccdf_yaml.oval.elements import Criteria
-from xccdf_yaml.cpe import get_affected_from_cpe
 
 # import os
 
@@ -65,10 +64,10 @@ class SystemdParser(GenericParser):
         # test
         test = OvalTest('oval:target_wants_{}:tst:1'.format(name),
                         'systemdunitdependency_test', ns=self.__ns__)
-        test.__elements_order__ = (
+        test.set_elements_order((
             'object',
             'state',
-        )
+        ))
         test.add_object(obj)
         test.add_state(state)
 
@@ -97,10 +96,10 @@ class SystemdParser(GenericParser):
         test = OvalTest('oval:target_wants_{}_socket:tst:1'.format(name),
                         'systemdunitdependency_test', ns=self.__ns__)
 
-        test.__elements_order__ = (
+        test.set_elements_order((
             'object',
             'state',
-        )
+        ))
 
         test.add_object(obj)
         test.add_state(state)
@@ -112,10 +111,10 @@ class SystemdParser(GenericParser):
         obj = OvalObject('oval:service_{}_state:obj:1'.format(name),
                          'systemdunitproperty_object', ns=self.__ns__)
 
-        obj.__elements_order__ = (
+        obj.set_elements_order((
             'unit',
             'property',
-        )
+        ))
 
         obj.sub_element('unit')\
             .set_text(r'{}\.(socket|service)'.format(name))\
@@ -137,10 +136,10 @@ class SystemdParser(GenericParser):
         test = OvalTest('oval:service_{}_state:tst:1'.format(name),
                         'systemdunitproperty_test', ns=self.__ns__)
 
-        test.__elements_order__ = (
+        test.set_elements_order((
             'object',
             'state',
-        )
+        ))
 
         test.set_attrs(test_running_attrs)
         test.add_object(obj)
@@ -154,11 +153,12 @@ class SystemdParser(GenericParser):
         metadata = definition.add_metadata()
         metadata.set_title(str(id))
         metadata.set_description('Check for {}'.format(id))
+        platform_table = self.benchmark.platform_table
         if isinstance(affected, list):
             for affect in affected:
-                metadata.set_affected('unix', get_affected_from_cpe(affect))
+                metadata.set_affected('unix', platform_table[affect])
         else:
-            metadata.set_affected('unix', get_affected_from_cpe(affected))
+            metadata.set_affected('unix', platform_table[affected])
 
         criteria = definition.add_criteria(operator='AND')
 
@@ -8,7 +8,6 @@ from xccdf_yaml.oval.elements import OvalState
 from xccdf_yaml.oval.elements import Criterion
 # from xccdf_yaml.oval import Metadata
 from xccdf_yaml.oval.elements import ExternalVariable
-from xccdf_yaml.cpe import get_affected_from_cpe
 
 import os
 
@@ -63,12 +62,12 @@ class TextfilecontentParser(GenericParser):
             obj = OvalObject('oval:{}_{}:obj:1'.format(id, idx),
                              'textfilecontent54_object', ns=self.__ns__)
 
-            obj.__elements_order__ = (
+            obj.set_elements_order((
                 'path',
                 'filename',
                 'pattern',
                 'instance',
-            )
+            ))
 
             obj.sub_element('path')\
                 .set_text(path)
@@ -129,11 +128,12 @@ class TextfilecontentParser(GenericParser):
         metadata = definition.add_metadata()
         metadata.set_title(str(id))
         metadata.set_description('Check for {}'.format(id))
+        platform_table = self.benchmark.platform_table
         if isinstance(affected, list):
             for affect in affected:
-                metadata.set_affected('unix', get_affected_from_cpe(affect))
+                metadata.set_affected('unix', platform_table[affect])
         else:
-            metadata.set_affected('unix', get_affected_from_cpe(affected))
+            metadata.set_affected('unix', platform_table[affected])
 
         criteria = definition.add_criteria()
         for test in res.tests:
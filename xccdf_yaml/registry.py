@@ -0,0 +1,118 @@
+import importlib
+
+from collections import OrderedDict
+
+# Entry point groups of check parsers, looked up in this order by 'type'
+CHECK_PARSERS_GROUP = 'xccdf_yaml.check_parsers'
+OVAL_PARSERS_GROUP = 'xccdf_yaml.oval_parsers'
+
+
+def _load(reference):
+    """ Returns object referenced by 'module:attribute' string """
+    module_name, _, attr = reference.partition(':')
+    obj = importlib.import_module(module_name)
+    for name in attr.split('.'):
+        obj = getattr(obj, name)
+    return obj
+
+
+def _entry_points(group):
+    """ Returns (name, entry point) of installed distributions """
+    from importlib.metadata import entry_points
+
+    eps = entry_points()
+    if hasattr(eps, 'select'):
+        eps = eps.select(group=group)
+    else:
+        eps = eps.get(group, [])
+    return [(ep.name, ep) for ep in eps]
+
+
+class ParserRegistry(object):
+    """ Parsers of rule types, imported on first use.
+
+    Built-in parsers are given as 'module:Class' references, so they are
+    available without the package being installed. Parsers of other
+    distributions are registered in the entry point group; entry points
+    are scanned only when a type isn't built-in or all parsers are listed,
+    as reading distributions metadata is slow.
+    """
+    def __init__(self, group, builtin=None):
+        self.group = group
+        self._refs = OrderedDict(builtin or {})
+        self._classes = {}
+        self._scanned = False
+
+    def _scan(self):
+        if self._scanned:
+            return
+        self._scanned = True
+        for name, ep in _entry_points(self.group):
+            self._refs.setdefault(name, ep)
+
+    def get(self, name, default=None, scan=True):
+        cls = self._classes.get(name)
+        if cls is not None:
+            return cls
+
+        if scan and name not in self._refs:
+            self._scan()
+        ref = self._refs.get(name)
+        if ref is None:
+            return default
+
+        if isinstance(ref, str):
+            cls = _load(ref)
+        else:
+            cls = ref.load()
+        self._classes[name] = cls
+        return cls
+
+    def __contains__(self, name):
+        if name not in self._refs:
+            self._scan()
+        return name in self._refs
+
+    def __getitem__(self, name):
+        cls = self.get(name)
+        if cls is None:
+            raise KeyError(name)
+        return cls
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        self._scan()
+        return list(self._refs)
+
+    def values(self):
+        return [self[x] for x in self.keys()]
+
+    def items(self):
+        return [(x, self[x]) for x in self.keys()]
+
+
+_parsers = {}
+
+
+def get_parser(parser_type):
+    """ Returns parser class of the rule type, XCCDF check parsers take
+    precedence over OVAL ones. Returns None if there is no such parser.
+    """
+    try:
+        return _parsers[parser_type]
+    except KeyError:
+        pass
+
+    from xccdf_yaml.oval.parsers import PARSERS as OVAL_PARSERS
+    from xccdf_yaml.xccdf.check import PARSERS as XCCDF_PARSERS
+
+    # Built-in parsers are checked first to not scan entry points for them
+    cls = XCCDF_PARSERS.get(parser_type, scan=False) or \
+        OVAL_PARSERS.get(parser_type, scan=False) or \
+        XCCDF_PARSERS.get(parser_type) or \
+        OVAL_PARSERS.get(parser_type)
+    if cls is not None:
+        _parsers[parser_type] = cls
+    return cls
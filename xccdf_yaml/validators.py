@@ -0,0 +1,198 @@
+import glob
+import hashlib
+import os
+import tempfile
+
+import lxml.etree as etree
+from collections import OrderedDict
+from lxml.isoschematron import Schematron
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from xccdf_yaml.cache import cache_dir, digest
+
+NIST_SCHEMATRON_URL = 'https://csrc.nist.gov/schema/xccdf/1.2/xccdf_1.2.sch'
+
+# Directories with SCAP schemas installed by OpenSCAP, the local copy in
+# the cache directory takes precedence over them
+OPENSCAP_SCHEMA_DIRS = [
+    '/usr/share/openscap/schemas',
+    '/usr/local/share/openscap/schemas',
+]
+
+# Maximum number of compiled validators kept by the process
+MAX_VALIDATORS = 16
+
+_validators = OrderedDict()
+
+
+SVRL_NS = 'http://purl.oclc.org/dsdl/svrl'
+
+
+class SchematronValidator(object):
+    """ Schematron validator running the validating XSLT stylesheet which
+    lxml.isoschematron compiles out of schematron. Document is valid if
+    the SVRL report of the stylesheet has no failed assertions; the report
+    of the last validation is kept in validation_report.
+    """
+    def __init__(self, validator_xslt):
+        self.validator_xslt = validator_xslt
+        self.validation_report = None
+        self._transform = etree.XSLT(validator_xslt)
+
+    def validate(self, doc):
+        self.validation_report = self._transform(doc)
+        return not self.validation_report.xpath(
+            '//svrl:failed-assert', namespaces={'svrl': SVRL_NS})
+
+    def __call__(self, doc):
+        return self.validate(doc)
+
+
+def _key(kind, path):
+    path = os.path.abspath(path)
+    return kind, path, os.stat(path).st_mtime_ns
+
+
+def _get_validator(key, factory):
+    validator = _validators.pop(key, None)
+    if validator is None:
+        validator = factory()
+        while len(_validators) >= MAX_VALIDATORS:
+            _validators.popitem(last=False)
+    _validators[key] = validator
+    return validator
+
+
+def _write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmpname, path)
+
+
+def _load_xml_schema(path):
+    with open(path) as f:
+        return etree.XMLSchema(etree.parse(f))
+
+
+def _load_schematron(path):
+    """ Returns Schematron validator. Validating XSLT is stored in the
+    cache directory under the schematron digest and lxml version (which
+    compiles it), so it is compiled only once.
+    """
+    xslt_file = cache_dir('schematron', '{}-lxml{}.xsl'.format(
+        digest(path), '.'.join(str(x) for x in etree.LXML_VERSION)))
+    try:
+        return SchematronValidator(etree.parse(xslt_file))
+    except (OSError, etree.XMLSyntaxError, etree.XSLTParseError):
+        pass
+
+    with open(path) as f:
+        schematron = Schematron(etree.parse(f), store_xslt=True)
+
+    _write_file(xslt_file, etree.tostring(schematron.validator_xslt))
+
+    return SchematronValidator(schematron.validator_xslt)
+
+
+def get_xml_schema(path):
+    """ Returns etree.XMLSchema for XSD file. Compiled schemas are shared
+    by the process until the file is modified.
+    """
+    return _get_validator(_key('xsd', path),
+                          lambda: _load_xml_schema(path))
+
+
+def get_schematron(path):
+    """ Returns Schematron validator for .sch file. Validators are shared
+    by the process until the file is modified.
+    """
+    return _get_validator(_key('sch', path),
+                          lambda: _load_schematron(path))
+
+
+def local_schematron(url=NIST_SCHEMATRON_URL):
+    """ Returns path to the local copy of schematron published at url """
+    return cache_dir('schematron', os.path.basename(url))
+
+
+def update_schematron(url=NIST_SCHEMATRON_URL, filename=None):
+    """ Stores schematron downloaded from url (or read from filename) as
+    the local copy along with its sha256 checksum. Returns local path.
+    """
+    if filename is None:
+        data = urlopen(url).read()
+    else:
+        with open(filename, 'rb') as f:
+            data = f.read()
+
+    # Make sure that the document is well-formed before replacing the copy
+    etree.fromstring(data)
+
+    path = local_schematron(url)
+    _write_file(path, data)
+    _write_file(path + '.sha256', hashlib.sha256(data).hexdigest().encode())
+    return path
+
+
+def get_schematron_file(url=NIST_SCHEMATRON_URL):
+    """ Returns path to the local copy of schematron published at url.
+    Schematron is downloaded only if there is no local copy or its
+    checksum doesn't match.
+    """
+    path = local_schematron(url)
+    try:
+        with open(path + '.sha256') as f:
+            checksum = f.read().strip()
+        if digest(path) == checksum:
+            return path
+    except OSError:
+        pass
+
+    try:
+        return update_schematron(url)
+    except URLError as e:
+        raise Exception("Unable to download schematron {}: {}. Use "
+                        "'schematron-update --file' to install it from a "
+                        "local file".format(url, e.reason))
+
+
+def get_datastream_schema_files(scap_version='1.3'):
+    """ Returns (XSD, schematron or None) of SCAP source data stream of
+    given version, or None if schemas aren't installed. Schemas are looked
+    up the way OpenSCAP lays them out:
+    sds/<version>/source-data-stream-<version>.xsd in the 'schemas' cache
+    directory or in OpenSCAP schema directories.
+    """
+    for schema_dir in [cache_dir('schemas')] + OPENSCAP_SCHEMA_DIRS:
+        path = os.path.join(schema_dir, 'sds', scap_version)
+        xsd_file = os.path.join(
+            path, 'source-data-stream-{}.xsd'.format(scap_version))
+        if os.path.exists(xsd_file):
+            schematron_files = sorted(glob.glob(os.path.join(path, '*.sch')))
+            return xsd_file, next(iter(schematron_files), None)
+    return None
+
+
+def validate_with_schemas(path, xsd_file, schematron_file=None):
+    """ Returns list of errors found in XML document by XML schema and
+    schematron. Both are compiled once, see get_xml_schema() and
+    get_schematron().
+    """
+    with open(path, 'rb') as f:
+        doc = etree.parse(f)
+
+    errors = []
+    schema = get_xml_schema(xsd_file)
+    if not schema.validate(doc):
+        errors.extend(str(x) for x in schema.error_log)
+
+    if schematron_file is not None:
+        schematron = get_schematron(schematron_file)
+        if not schematron.validate(doc):
+            errors.extend(x.text for x in schematron.validation_report.xpath(
+                '//svrl:failed-assert/svrl:text',
+                namespaces={'svrl': SVRL_NS}))
+    return errors
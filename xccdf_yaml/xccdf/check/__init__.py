@@ -1,8 +1,7 @@
-from xccdf_yaml.xccdf.check.cmd_exec import CmdExecParser
-from xccdf_yaml.xccdf.check.sce import ScriptCheckEngineParser
+from xccdf_yaml.registry import ParserRegistry, CHECK_PARSERS_GROUP
 
 
-PARSERS = {
-    'cmd_exec': CmdExecParser,
-    'sce': ScriptCheckEngineParser,
-}
+PARSERS = ParserRegistry(CHECK_PARSERS_GROUP, {
+    'cmd_exec': 'xccdf_yaml.xccdf.check.cmd_exec:CmdExecParser',
+    'sce': 'xccdf_yaml.xccdf.check.sce:ScriptCheckEngineParser',
+})
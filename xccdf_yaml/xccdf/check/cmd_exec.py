@@ -1,5 +1,6 @@
 from xccdf_yaml.xccdf.check.common import GenericParser
 
+import hashlib
 import re
 
 
@@ -75,23 +76,20 @@ except:
 
 class CmdExecParser(GenericParser):
     def parse(self, rule, metadata):
-        id = rule.xccdf_id
-
         if 'cmd' in metadata:
-            self.shared_files.new('wrapper-head.sh',
-                                  content=SHELL_WRAPPER_HEAD)\
-                .set_executable()
-            self.shared_files.new('wrapper-tail.sh',
-                                  content=SHELL_WRAPPER_TAIL)\
-                .set_executable()
-            filename = '{}.sh'.format(id)
+            for name, wrapper in [('wrapper-head.sh', SHELL_WRAPPER_HEAD),
+                                  ('wrapper-tail.sh', SHELL_WRAPPER_TAIL)]:
+                if name not in self.shared_files:
+                    self.shared_files.new(name, content=wrapper)\
+                        .set_executable()
+            extension = 'sh'
             content = []
             content.append('#!/bin/bash')
             content.append('source wrapper-head.sh')
             content.append(metadata['cmd'])
             content.append('source wrapper-tail.sh')
         elif 'python' in metadata:
-            filename = '{}.py'.format(id)
+            extension = 'py'
             content = []
             content.append(PYTHON_WRAPPER_HEAD1)
             content.extend(metadata['python'].get('imports', []))
@@ -108,8 +106,12 @@ class CmdExecParser(GenericParser):
         else:
             raise Exception('No script or cmdline found')
 
-        self.shared_files.new(filename,
-                              content='\n'.join(content)).set_executable()
+        # Rules with the same script share a single file
+        content = '\n'.join(content)
+        filename = 'cmd-{}.{}'.format(
+            hashlib.sha256(content.encode()).hexdigest()[:16], extension)
+        if filename not in self.shared_files:
+            self.shared_files.new(filename, content=content).set_executable()
 
         check = rule.add_check(system_ns='sce')\
             .check_import(import_name='stdout')\
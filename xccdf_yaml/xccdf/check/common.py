@@ -1,7 +1,25 @@
-class GenericParser(object):
+import abc
+
+from xccdf_yaml.encoding import CodeEncoder
+
+
+class GenericParser(abc.ABC):
+    """ Parser of a rule type. A single instance parses all rules of its
+    type within a conversion, so it may keep data shared by these rules.
+    """
     def __init__(self, generator, benchmark, parsed_args=None, output_dir=None,
-                 shared_files=None):
+                 shared_files=None, encoder=None):
         self.generator = generator
         self.benchmark = benchmark
         self.parsed_args = parsed_args
         self.shared_files = shared_files
+        self.encoder = encoder or CodeEncoder()
+
+    @abc.abstractmethod
+    def parse(self, rule, metadata):
+        """ Adds check described by rule metadata to the rule """
+
+    def finalize(self):
+        """ Completes work deferred by parse() calls made so far. Called
+        before parsed rules are written, may be called several times.
+        """
@@ -2,9 +2,7 @@ from xccdf_yaml.xccdf.check.common import GenericParser
 from itertools import chain
 
 import re
-import base64
-import zlib
-import textwrap
+import hashlib
 
 
 SHELL_ENTRYPOINT = """#!/bin/bash
@@ -96,19 +94,14 @@ class ScriptCheckEngineParser(GenericParser):
             .check_content_ref(href=entrypoint)
 
         codeblock = check_metadata['codeblock']
-        if engine == 'python':
-            compressed_codeblock = textwrap.fill(
-                base64.b64encode(zlib.compress(codeblock.encode())).decode(),
-                120
-            )
-        else:
-            compressed_codeblock = textwrap.fill(
-                base64.b64encode(codeblock.encode()).decode(), 120)
-
-        value = self.benchmark.new_value(
-            '{}-codeblock'.format(rule.xccdf_id))\
-            .set_value(compressed_codeblock)\
-            .set_description(codeblock, plaintext=True)
+        # Rules with the same code share a single value
+        value_id = 'codeblock-{}'.format(hashlib.sha256(
+            '{}\0{}'.format(engine, codeblock).encode()).hexdigest()[:16])
+        value = self.benchmark.get_value(value_id)
+        if value is None:
+            value = self.benchmark.new_value(value_id)\
+                .set_description(codeblock, plaintext=True)
+            self.encoder.add(value, codeblock, compress=engine == 'python')
         check.check_export(value.xccdf_id, 'CODEBLOCK')
 
         index = 0
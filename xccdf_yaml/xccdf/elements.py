@@ -4,6 +4,7 @@ import re
 from collections import namedtuple, OrderedDict
 from enum import Enum
 from xccdf_yaml.xml import XmlCommon
+from xccdf_yaml.xml import XmlFragment
 from xccdf_yaml.xml import DublinCoreElementBase
 from xccdf_yaml.markdown import MarkdownHtml
 
@@ -49,11 +50,15 @@ class XccdfBoolean(Enum):
 
 
 class XmlBase(XmlCommon):
+    __slots__ = ()
+
     def __init__(self, name, ns=None):
         super().__init__(name, ns=ns, nsmap=NSMAP)
 
 
 class XccdfBase(XmlBase):
+    __slots__ = ('_id', '_xccdf_id', '_generator')
+
     def __init__(self, generator, name, id=None, ns=None):
         super().__init__(name, ns=ns)
         self._id = id
@@ -80,11 +85,15 @@ class XccdfBase(XmlBase):
 
 
 class XccdfDublinCoreElement(DublinCoreElementBase):
+    __slots__ = ()
+
     def __init__(self, name):
         super().__init__(name, nsmap=NSMAP)
 
 
 class SetTitleMixin(object):
+    __slots__ = ()
+
     def set_title(self, text):
         if text is not None:
             content = text.rstrip()
@@ -93,6 +102,8 @@ class SetTitleMixin(object):
 
 
 class SetDescriptionMixin(object):
+    __slots__ = ()
+
     def set_description(self, text, plaintext=False):
         if text is not None:
             self.sub_element('description')\
@@ -142,6 +153,7 @@ class XccdfGenerator(object):
 
 
 class XccdfBenchmarkElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
+    __stream__ = True
     __elements_order__ = (
         'status',
         'title',
@@ -154,11 +166,14 @@ class XccdfBenchmarkElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
         'Group',
         'Rule',
     )
+    __slots__ = ('_platforms', '_platform_table', '_profiles', '_groups',
+                 '_values', '_rules', '_dc_metadata', '_status', 'version')
 
     def __init__(self, xccdf, id, version='0.1'):
         super().__init__(generator=xccdf, name='Benchmark', id=id)
         self._id = id
         self._platforms = set()
+        self._platform_table = None
         self._profiles = OrderedDict()
         self._groups = OrderedDict()
         self._values = OrderedDict()
@@ -171,7 +186,17 @@ class XccdfBenchmarkElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
     def platforms(self):
         return self._platforms
 
+    @property
+    def platform_table(self):
+        """ Returns PlatformTable of the benchmark platforms """
+        if self._platform_table is None:
+            from xccdf_yaml.cpe import PlatformTable
+
+            self._platform_table = PlatformTable(self._platforms)
+        return self._platform_table
+
     def set_status(self, status_string='draft', status_date=None):
+        self.changed()
         status = XccdfStatusElement(self.xccdf,
                                     status=status_string,
                                     timestamp=status_date)
@@ -179,19 +204,23 @@ class XccdfBenchmarkElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
         return self
 
     def append_status(self, item):
+        self.changed()
         self._status.append(item)
         return self
 
     def set_version(self, version=None):
+        self.changed()
         if version is not None:
             self.version = str(version)
         return self
 
     def add_platform(self, name):
+        self.changed()
         self._platforms.add(name)
         return self
 
     def append_profile(self, item):
+        self.changed()
         self._profiles.setdefault(item.xccdf_id, item)
         return self
 
@@ -202,9 +231,11 @@ class XccdfBenchmarkElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
         return self._profiles.get(id)
 
     def new_profile(self, id):
+        self.changed()
         return self._profiles.setdefault(id, self.xccdf.profile(id))
 
     def append_group(self, item):
+        self.changed()
         self._groups.setdefault(item.xccdf_id, item)
         return self
 
@@ -215,23 +246,37 @@ class XccdfBenchmarkElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
         return self._groups.get(id)
 
     def new_group(self, id):
+        self.changed()
         return self._groups.setdefault(id, self.xccdf.group(id))
 
     def append_rule(self, item):
+        self.changed()
         self._rules.setdefault(item.xccdf_id, item)
         return self
 
-    def append_value(self, item):
-        self._values.setdefault(item.xccdf_id, item)
+    def append_value(self, item, key=None):
+        self.changed()
+        self._values.setdefault(key or item.xccdf_id, item)
         return self
 
+    @property
+    def values(self):
+        return self._values.items()
+
     def new_value(self, id):
+        self.changed()
         return self._values.setdefault(id, self.xccdf.value(id))
 
     def get_value(self, id):
         return self._values.get(id)
 
+    def replace_value(self, id, item):
+        self.changed()
+        self._values[id] = item
+        return self
+
     def add_dc_metadata(self):
+        self.changed()
         metadata = self.xccdf.dc_metadata()
         self._dc_metadata = metadata
         return metadata
@@ -272,11 +317,13 @@ class XccdfBenchmarkElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
 
 
 class XccdfTailoringElement(XccdfBase):
+    __stream__ = True
     __elements_order__ = (
         'status',
         'version',
         'Profile',
     )
+    __slots__ = ('_profiles', '_status', 'version')
 
     def __init__(self, xccdf, id, version='0.1'):
         super().__init__(generator=xccdf, name='Tailoring', id=id)
@@ -285,13 +332,16 @@ class XccdfTailoringElement(XccdfBase):
         self.version = version
 
     def append_profile(self, item):
+        self.changed()
         self._profiles.setdefault(item.xccdf_id, item)
         return self
 
     def add_profile(self, id):
+        self.changed()
         return self._profiles.setdefault(id, self.xccdf.profile(id))
 
     def set_status(self, status_string='draft', status_date=None):
+        self.changed()
         status = XccdfStatusElement(self.xccdf,
                                     status=status_string,
                                     timestamp=status_date)
@@ -299,10 +349,12 @@ class XccdfTailoringElement(XccdfBase):
         return self
 
     def append_status(self, item):
+        self.changed()
         self._status.append(item)
         return self
 
     def set_version(self, version=None):
+        self.changed()
         if version is not None:
             self.version = str(version)
         return self
@@ -336,6 +388,7 @@ class XccdfProfileElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
         'refine-value',
         'refine-rule',
     )
+    __slots__ = ('_selectors', '_status', '_platforms')
 
     def __init__(self, xccdf, id):
         super().__init__(generator=xccdf, name='Profile', id=id)
@@ -348,15 +401,18 @@ class XccdfProfileElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
         return self._platforms
 
     def add_platform(self, name):
+        self.changed()
         self._platforms.add(name)
         return self
 
     def set_status(self, status='draft', status_date=None):
+        self.changed()
         self._status.append(XccdfStatusElement(status=status,
                                                timestamp=status_date))
         return self
 
     def append_status(self, item):
+        self.changed()
         self._status.append(item)
         return self
 
@@ -364,6 +420,7 @@ class XccdfProfileElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
         self.sub_element('version').set_text(version)
 
     def selector(self, selector, idref, **kwargs):
+        self.changed()
         key = self.SelectorKey(selector, idref)
         if selector == 'select':
             self._selectors[key] = XccdfBoolean.parse(kwargs['selected'])
@@ -400,10 +457,12 @@ class XccdfProfileElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
 
 
 class XccdfGroupElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
+    __stream__ = True
     __elements_order__ = (
         'title',
         'description',
     )
+    __slots__ = ('_selected', '_rules', '_profiles')
 
     def __init__(self, xccdf, id):
         super().__init__(generator=xccdf, name='Group', id=id)
@@ -421,15 +480,18 @@ class XccdfGroupElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
         return self
 
     def append_rule(self, rule):
+        self.changed()
         self._rules.append(rule)
         return rule
 
     def add_rule(self, id):
+        self.changed()
         rule = self.xccdf.rule(id)
         self._rules.append(rule)
         return rule
 
     def selected(self, selected=True):
+        self.changed()
         self._selected = XccdfBoolean.parse(selected)
 
     def update_elements(self):
@@ -450,6 +512,8 @@ class XccdfRuleElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
         'ident',
         'check',
     )
+    __slots__ = ('_selected', '_checks', '_references', '_dc_references',
+                 '_profiles', 'group')
 
     def __init__(self, xccdf, id, severity='medium'):
         super().__init__(generator=xccdf, name='Rule', id=id)
@@ -471,6 +535,7 @@ class XccdfRuleElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
         return self
 
     def add_check(self, **kwargs):
+        self.changed()
         check = self.xccdf.check(**kwargs)
         self._checks.append(check)
         return check
@@ -483,6 +548,7 @@ class XccdfRuleElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
         return ref
 
     def add_dc_reference(self):
+        self.changed()
         ref = XccdfReferenceElement(self.xccdf)
         self._dc_references.append(ref)
         return ref
@@ -499,8 +565,15 @@ class XccdfRuleElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
         return self
 
     def selected(self, selected=True):
+        self.changed()
         self._selected = XccdfBoolean.parse(selected)
 
+    def exported_values(self):
+        """ Returns ids of values exported to the rule checks """
+        for check in self._checks:
+            for export in check.elements('check-export'):
+                yield export.get_attr('value-id')
+
     def update_elements(self):
         self.set_attr('id', self.xccdf_id)
         self.set_attr('selected', str(self._selected))
@@ -517,6 +590,41 @@ class XccdfRuleElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
             self.append(x)
 
 
+class XccdfFragment(XmlFragment):
+    """ Serialized XCCDF item (Rule, Value, ...) keeping its XCCDF id. """
+    __slots__ = ('xccdf_id',)
+
+    nsmap = NSMAP
+
+    def __init__(self, name, xccdf_id, content, depth):
+        super().__init__(name, content, depth)
+        self.xccdf_id = xccdf_id
+
+    @classmethod
+    def from_element(cls, element, content, depth):
+        return cls(element._name, element.xccdf_id, content, depth)
+
+
+class XccdfRuleFragment(XccdfFragment):
+    """ Serialized Rule along with attributes required to put it into
+    a group and select it in profiles.
+    """
+    __slots__ = ('group', '_profiles')
+
+    def __init__(self, xccdf_id, group, profiles, content, depth):
+        super().__init__('Rule', xccdf_id, content, depth)
+        self.group = group
+        self._profiles = profiles
+
+    @classmethod
+    def from_element(cls, rule, content, depth):
+        return cls(rule.xccdf_id, rule.group, rule._profiles, content, depth)
+
+    @property
+    def profiles(self):
+        return self._profiles.items()
+
+
 class XccdfCheckElement(XmlBase):
     __elements_order__ = (
         'check-import',
@@ -524,6 +632,7 @@ class XccdfCheckElement(XmlBase):
         'check-content',
         'check-content-ref',
     )
+    __slots__ = ('xccdf',)
 
     def __init__(self, xccdf, id=None, system_ns='oval-def'):
         super().__init__('check')
@@ -563,6 +672,8 @@ class XccdfValueElement(XccdfBase, SetTitleMixin, SetDescriptionMixin):
         'lower-bound',
         'upper-bound',
     )
+    __slots__ = ('_value', '_default_value', '_match', '_lower_bound',
+                 '_upper_bound')
 
     def __init__(self, xccdf, id):
         super().__init__(generator=xccdf, name='Value', id=id)
@@ -661,6 +772,7 @@ class XccdfStatusElement(XmlBase):
     valid_statuses = (
         'incomplete', 'draft', 'interim', 'accepted', 'deprecated'
     )
+    __slots__ = ('xccdf',)
 
     def __init__(self, xccdf, status='draft', timestamp=None):
         super().__init__('status')
@@ -683,6 +795,8 @@ class XccdfStatusElement(XmlBase):
 
 
 class XccdfVersionElement(XmlBase):
+    __slots__ = ('xccdf',)
+
     def __init__(self, xccdf, version, timestamp=None):
         super().__init__('version')
         self.xccdf = xccdf
@@ -700,12 +814,16 @@ class XccdfVersionElement(XmlBase):
 
 
 class XccdfReferenceElement(XccdfDublinCoreElement):
+    __slots__ = ('xccdf',)
+
     def __init__(self, xccdf):
         super().__init__('reference')
         self.xccdf = xccdf
 
 
 class XccdfMetadataElement(XccdfDublinCoreElement):
+    __slots__ = ('xccdf',)
+
     def __init__(self, xccdf):
         super().__init__('metadata')
         self.xccdf = xccdf
@@ -1,19 +1,51 @@
-import base64
 # import html
 import os
-import textwrap
-import zlib
 
-import lxml.etree as etree
-
-
-from collections import OrderedDict
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from xccdf_yaml.appdata import APPDATA, init_worker
 from xccdf_yaml.common import SharedFiles
+from xccdf_yaml.datastream import compose_datastream
+from xccdf_yaml.encoding import CodeEncoder
 from xccdf_yaml.misc import unlist, deepmerge
-from xccdf_yaml.appdata import APPDATA
+from xccdf_yaml.registry import get_parser
+from xccdf_yaml.xml import XmlSpool, XmlWriter
+from xccdf_yaml.xccdf.elements import XccdfFragment, XccdfRuleFragment
+
+# Number of rules sent to a worker process at once
+RULES_CHUNK_SIZE = 32
+
+# Benchmark parser of a worker process building rules
+_rules_worker = None
+
+
+def _init_rules_worker(appdata, generator, basedir, workdir, data):
+    """ Initializes worker process with a benchmark parsed from data of
+    the parent's benchmark without rules.
+    """
+    global _rules_worker
+    init_worker(appdata)
+    _rules_worker = XccdfYamlBenchmarkParser(generator, basedir, workdir)
+    _rules_worker.parse(data)
+
+
+def _build_rules_worker(rules):
+    parser = _rules_worker
+    return [parser._build_rule(parser.benchmark, parser.rule_parser, x,
+                               detached=True)
+            for x in rules]
+
 
-from xccdf_yaml.oval.parsers import PARSERS as OVAL_PARSERS
-from xccdf_yaml.xccdf.check import PARSERS as XCCDF_PARSERS
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 
 class StatusParserMixin(object):
@@ -195,6 +227,12 @@ class XccdfYamlValueParser(XccdfYamlParser):
       low: value2_upper_bound_low
       high: value2_upper_bound_high
     """
+    def __init__(self, generator, benchmark=None, default=None,
+                 encoder=None):
+        super(XccdfYamlValueParser, self).__init__(generator, benchmark,
+                                                   default=default)
+        self.encoder = encoder or CodeEncoder()
+
     def parse(self, data):
         value = self.generator.value(data['id'])
         self._parse(value, data)
@@ -217,12 +255,10 @@ class XccdfYamlValueParser(XccdfYamlParser):
 
         if value_type == 'code':
             value_obj.set_attr('type', 'string')
-            value_str = textwrap.fill(base64.b64encode(
-                zlib.compress(value_str.encode())).decode(), 120)
+            self.encoder.add(value_obj, value_str)
         else:
             value_obj.set_attr('type', value_type)
-
-        value_obj.set('value', value_str)
+            value_obj.set('value', value_str)
 
         for key in ['operator', ]:
             if key in data:
@@ -263,15 +299,44 @@ class XccdfYamlRuleParser(XccdfYamlParser):
         <code>
     """
     def __init__(self, generator, benchmark, parsed_args=None,
-                 shared_files=None):
+                 shared_files=None, encoder=None):
         super(XccdfYamlRuleParser, self).__init__(generator, benchmark)
         self.parsed_args = parsed_args
         self.shared_files = shared_files
+        self.encoder = encoder or CodeEncoder()
+        # Check parsers by rule type, created on first use
+        self._parsers = OrderedDict()
 
     def parse(self, data):
+        rule = self.parse_rule(data)
+        self.append(rule)
+
+    def finalize(self):
+        """ Completes work deferred by check parsers and encodes code
+        values of the rules parsed so far.
+        """
+        for parser in self._parsers.values():
+            parser.finalize()
+        self.encoder.flush()
+
+    def check_parser(self, parser_type):
+        parser = self._parsers.get(parser_type)
+        if parser is None:
+            parser_cls = get_parser(parser_type)
+            if parser_cls is None:
+                raise Exception("Can't find parser for '{}'"
+                                .format(parser_type))
+            parser = parser_cls(self.generator, self.benchmark,
+                                parsed_args=self.parsed_args,
+                                shared_files=self.shared_files,
+                                encoder=self.encoder)
+            self._parsers[parser_type] = parser
+        return parser
+
+    def parse_rule(self, data):
         rule = self.generator.rule(data['id'])
         self._parse(rule, data)
-        self.append(rule)
+        return rule
 
     def _parse(self, rule, data):
         if 'title' in data:
@@ -313,25 +378,32 @@ class XccdfYamlRuleParser(XccdfYamlParser):
                 selected=profile.get('selected', True)
             )
 
-        platforms = list(self.benchmark.platforms)
+        platforms = list(self.benchmark.platform_table)
         if platforms and not data.get('affected', False):
             data['affected'] = platforms
 
         # if 'variable' in data:
         #     data['external-variables'] = variables_types
 
-        parser_type = data.get('type', 'sce')
-        parser_cls = XCCDF_PARSERS.get(parser_type)
-        if parser_cls is None:
-            parser_cls = OVAL_PARSERS.get(parser_type)
-        if parser_cls is None:
-            raise Exception("Can't find parser for '{}'".format(parser_type))
+        parser = self.check_parser(data.get('type', 'sce'))
+        parser.parse(rule, data)
 
-        parser = parser_cls(self.generator, self.benchmark,
-                            parsed_args=self.parsed_args,
-                            shared_files=self.shared_files)
 
-        parser.parse(rule, data)
+class XccdfRuleBuild(object):
+    """ Result of a single rule parsing: serialized Rule along with Values
+    and shared files it requires. Builds are stored in the build manifest
+    to be reused by subsequent conversions.
+    """
+    def __init__(self, rule, values=None, shared_files=None):
+        self.rule = rule
+        self.values = values or []
+        self.shared_files = shared_files or []
+
+    def restore(self, benchmark, shared_files):
+        for key, value in self.values:
+            benchmark.append_value(value, key=key)
+        for shared_file in self.shared_files:
+            shared_files.restore(shared_file)
 
 
 class XccdfYamlBenchmarkParser(XccdfYamlParser, StatusParserMixin):
@@ -368,12 +440,26 @@ class XccdfYamlBenchmarkParser(XccdfYamlParser, StatusParserMixin):
       - <profile params>
 
     """
-    def __init__(self, generator, basedir, workdir):
+    def __init__(self, generator, basedir, workdir, streaming=False,
+                 manifest=None):
         super(XccdfYamlBenchmarkParser, self).__init__(generator)
         self.basedir = basedir
         self.workdir = workdir
         self.shared_files = SharedFiles(basedir=basedir, workdir=workdir)
         self.filename = None
+        # In streaming mode every rule is serialized to the spool right
+        # after it is parsed, so only one rule object is alive at a time.
+        self.streaming = streaming
+        self.spool = None
+        # With build manifest rules are serialized right after parsing too
+        # and rules built from unchanged data are taken from the manifest.
+        self.manifest = manifest
+        self._generated_values = {}
+        self.rule_parser = None
+        self.output_file = None
+        # Code values are encoded in batches by a thread pool
+        self.encoder = CodeEncoder(jobs=APPDATA['jobs'],
+                                   level=APPDATA['compress_level'])
 
     def parse(self, data):
         self.benchmark = self.generator.benchmark(data['id'])
@@ -439,7 +525,8 @@ class XccdfYamlBenchmarkParser(XccdfYamlParser, StatusParserMixin):
 
         # Import values & snippets
 
-        value_parser = XccdfYamlValueParser(self.generator, benchmark)
+        value_parser = XccdfYamlValueParser(self.generator, benchmark,
+                                            encoder=self.encoder)
         for value_data in data.get('values', []):
             value_parser.parse(value_data)
 
@@ -447,10 +534,13 @@ class XccdfYamlBenchmarkParser(XccdfYamlParser, StatusParserMixin):
             'type': 'code'
         }
         snippet_parser = XccdfYamlValueParser(self.generator, benchmark,
-                                              default=snippet_default)
+                                              default=snippet_default,
+                                              encoder=self.encoder)
         for snippet_data in data.get('snippets', []):
             snippet_parser.parse(snippet_data)
 
+        self.encoder.flush()
+
         for value in value_parser:
             benchmark.append_value(value)
 
@@ -469,42 +559,204 @@ class XccdfYamlBenchmarkParser(XccdfYamlParser, StatusParserMixin):
         # Import rules
 
         rule_parser = XccdfYamlRuleParser(self.generator, benchmark,
-                                          shared_files=self.shared_files)
+                                          shared_files=self.shared_files,
+                                          encoder=self.encoder)
+        self.rule_parser = rule_parser
+        rules = data.get('rules', [])
+        if APPDATA['jobs'] > 1 and rules:
+            # Rules are built by worker processes, every worker parses the
+            # benchmark without rules first to get the same values, groups
+            # and shared files.
+            header = dict((k, v) for k, v in data.items() if k != 'rules')
+            builds = self._build_rules_parallel(benchmark, rules, header)
+            self._append_builds(benchmark, builds, default_profile)
+            return
+
+        if self.streaming or self.manifest is not None:
+            builds = self._build_rules(benchmark, rule_parser, rules)
+            self._append_builds(benchmark, builds, default_profile)
+            return
+
         for rule_data in unlist(data.get('rules', [])):
             rule_parser.parse(rule_data)
+        rule_parser.finalize()
 
         for rule in rule_parser:
-            if rule.group:
-                group = benchmark.group(
-                    self.generator.id('group', rule.group)
-                )
-                group.append_rule(rule)
-            else:
-                group = None
-                benchmark.append_rule(rule)
-
-            if group:
-                profile = None
-                for profile_name, profile_data in group.profiles:
-                    profile = benchmark.profile(
-                        self.generator.id('profile', profile_name))
-                    profile.select_item(
-                        group, selected=profile_data.get('selected', False))
-
-                if profile is None and default_profile:
-                    default_profile.select_item(group, selected=True)
+            self._append_rule(benchmark, rule, default_profile)
+
+    def _manifest_context(self, benchmark):
+        return [self.generator.namespace,
+                sorted(benchmark.platforms),
+                sorted(key for key, _ in benchmark.values),
+                self.encoder.level]
+
+    def _cached_builds(self, rules, context):
+        """ Yields (manifest key, build or None, rule data) """
+        for rule_data in unlist(rules):
+            key = build = None
+            if self.manifest is not None:
+                key = self.manifest.digest(rule_data, context)
+                build = self.manifest.get_rule(key)
+            yield key, build, rule_data
+
+    def _restore_build(self, benchmark, build):
+        build.restore(benchmark, self.shared_files)
+        for value_key, value in build.values:
+            self._generated_values[value.xccdf_id] = value_key
+
+    def _build_rules(self, benchmark, rule_parser, rules):
+        """ Yields builds of rules in source order, rules which aren't
+        in the build manifest are parsed one by one.
+        """
+        context = None
+        if self.manifest is not None:
+            context = self._manifest_context(benchmark)
+
+        for key, build, rule_data in self._cached_builds(rules, context):
+            if build is None:
+                build = self._build_rule(benchmark, rule_parser, rule_data)
+                if self.manifest is not None:
+                    self.manifest.set_rule(key, build)
             else:
-                profile = None
-                for profile_name, profile_data in rule.profiles:
-                    profile = benchmark.profile(
-                        self.generator.id('profile', profile_name))
-                    profile.select_item(
-                        rule, selected=profile_data.get('selected', False))
-
-                if profile is None and default_profile:
-                    default_profile.select_item(rule, selected=True)
-
-    def export(self, output_basedir=None, output_dir=None, output_file=None):
+                self._restore_build(benchmark, build)
+            yield build
+
+    def _build_rules_parallel(self, benchmark, rules, header):
+        """ Yields builds of rules in source order, rules which aren't
+        in the build manifest are sent to a pool of worker processes by
+        chunks. Builds are merged to the benchmark the same way as ones
+        taken from the build manifest.
+        """
+        context = None
+        if self.manifest is not None:
+            context = self._manifest_context(benchmark)
+
+        jobs = APPDATA['jobs']
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=jobs,
+                                 initializer=_init_rules_worker,
+                                 initargs=(APPDATA.copy(), self.generator,
+                                           self.basedir, self.workdir,
+                                           header)) as executor:
+            chunks = _chunks(self._cached_builds(rules, context),
+                             RULES_CHUNK_SIZE)
+            for chunk in chunks:
+                missing = [x for _, build, x in chunk if build is None]
+                future = None
+                if missing:
+                    future = executor.submit(_build_rules_worker, missing)
+                pending.append((chunk, future))
+                # Only a few chunks are kept in flight, so streaming mode
+                # doesn't load all the rules at once.
+                if len(pending) > 2 * jobs:
+                    yield from self._merge_builds(benchmark,
+                                                  *pending.popleft())
+            while pending:
+                yield from self._merge_builds(benchmark, *pending.popleft())
+
+    def _merge_builds(self, benchmark, chunk, future):
+        builds = iter(future.result() if future is not None else [])
+        for key, build, _ in chunk:
+            if build is None:
+                build = next(builds)
+                if self.manifest is not None:
+                    self.manifest.set_rule(key, build)
+            self._restore_build(benchmark, build)
+            yield build
+
+    def _append_builds(self, benchmark, builds, default_profile):
+        if self.streaming:
+            self.spool = XmlSpool()
+
+        rule_ids = set()
+        for build in builds:
+            rule = build.rule
+            if rule.xccdf_id in rule_ids:
+                continue
+            rule_ids.add(rule.xccdf_id)
+
+            if self.spool is not None:
+                rule = XccdfRuleFragment(rule.xccdf_id, rule.group,
+                                         rule._profiles,
+                                         self.spool.store(rule.content),
+                                         rule.depth)
+            self._append_rule(benchmark, rule, default_profile)
+
+    def _build_rule(self, benchmark, rule_parser, rule_data,
+                    detached=False):
+        """ Returns build of a single rule. Detached build holds values
+        the rule requires serialized, as for the build manifest, so it can
+        be restored to another benchmark.
+        """
+        values_count = len(benchmark.values)
+        self.shared_files.start_recording()
+        try:
+            rule = rule_parser.parse_rule(rule_data)
+            rule_parser.finalize()
+        finally:
+            shared_files = self.shared_files.stop_recording()
+
+        ancestors = [benchmark]
+        if rule.group:
+            ancestors.append(benchmark.group(
+                self.generator.id('group', rule.group)))
+        content = XmlWriter.render(rule, ancestors)
+        fragment = XccdfRuleFragment.from_element(rule, content,
+                                                  len(ancestors))
+        if self.manifest is None and not detached:
+            return XccdfRuleBuild(fragment)
+
+        # Values created by the rule are serialized right away and values
+        # created by previous rules which this rule refers to are already
+        # serialized.
+        values = OrderedDict(islice(reversed(benchmark.values),
+                                    len(benchmark.values) - values_count))
+        values = OrderedDict(reversed(values.items()))
+        for key, value in values.items():
+            values[key] = XccdfFragment.from_element(
+                value, XmlWriter.render(value, [benchmark]), 1)
+            benchmark.replace_value(key, values[key])
+            self._generated_values[value.xccdf_id] = key
+        for xccdf_id in rule.exported_values():
+            key = self._generated_values.get(xccdf_id)
+            if key is not None and key not in values:
+                values[key] = benchmark.get_value(key)
+
+        return XccdfRuleBuild(fragment, list(values.items()), shared_files)
+
+    def _append_rule(self, benchmark, rule, default_profile):
+        if rule.group:
+            group = benchmark.group(
+                self.generator.id('group', rule.group)
+            )
+            group.append_rule(rule)
+        else:
+            group = None
+            benchmark.append_rule(rule)
+
+        if group:
+            profile = None
+            for profile_name, profile_data in group.profiles:
+                profile = benchmark.profile(
+                    self.generator.id('profile', profile_name))
+                profile.select_item(
+                    group, selected=profile_data.get('selected', False))
+
+            if profile is None and default_profile:
+                default_profile.select_item(group, selected=True)
+        else:
+            profile = None
+            for profile_name, profile_data in rule.profiles:
+                profile = benchmark.profile(
+                    self.generator.id('profile', profile_name))
+                profile.select_item(
+                    rule, selected=profile_data.get('selected', False))
+
+            if profile is None and default_profile:
+                default_profile.select_item(rule, selected=True)
+
+    def export(self, output_basedir=None, output_dir=None, output_file=None,
+               link_files=False):
         if output_dir is None:
             if output_basedir is None:
                 output_basedir = os.path.join(APPDATA['workdir'], 'output')
@@ -513,13 +765,8 @@ class XccdfYamlBenchmarkParser(XccdfYamlParser, StatusParserMixin):
                                       self.benchmark.version)
         os.makedirs(output_dir, exist_ok=True)
 
-        self.shared_files.export(output_dir)
-
-        benchmark_xml = self.benchmark.xml()
-        benchmark_xml_str = etree.tostring(benchmark_xml,
-                                           encoding='utf-8',
-                                           xml_declaration=True,
-                                           pretty_print=True).decode()
+        self.shared_files.export(output_dir, manifest=self.manifest,
+                                 jobs=APPDATA['jobs'], link=link_files)
 
         # if not oval.is_empty():
         #     oval_filename = os.path.join(output_dir, oval_ref)
@@ -537,11 +784,29 @@ class XccdfYamlBenchmarkParser(XccdfYamlParser, StatusParserMixin):
         else:
             output_file = os.path.join(output_dir, output_file)
 
-        with open(output_file, 'w') as f:
-            f.write(benchmark_xml_str)
+        with open(output_file, 'wb') as f:
+            self.benchmark.write(f)
+
+        if self.spool is not None:
+            self.spool.close()
+
+        if self.manifest is not None:
+            self.manifest.save()
 
+        self.output_file = output_file
         return output_file
 
+    def export_datastream(self, output_file=None, scap_version='1.3'):
+        """ Composes source data stream out of exported benchmark and
+        shared files. Returns data stream file name.
+        """
+        if output_file is None:
+            output_file = '{}-ds.xml'.format(
+                self.output_file.rsplit('.', maxsplit=1)[0])
+        return compose_datastream(self.output_file, output_file,
+                                  shared_files=self.shared_files,
+                                  scap_version=scap_version)
+
 
 class XccdfYamlTailoringParser(XccdfYamlParser, StatusParserMixin):
     """
@@ -596,7 +861,8 @@ class XccdfYamlTailoringParser(XccdfYamlParser, StatusParserMixin):
         for profile in profile_parser:
             self.tailoring.append_profile(profile)
 
-    def export(self, output_basedir=None, output_dir=None, output_file=None):
+    def export(self, output_basedir=None, output_dir=None, output_file=None,
+               link_files=False):
         if output_dir is None:
             if output_basedir is None:
                 output_basedir = os.path.join(APPDATA['workdir'], 'output')
@@ -605,13 +871,8 @@ class XccdfYamlTailoringParser(XccdfYamlParser, StatusParserMixin):
                                       self.tailoring.version)
         os.makedirs(output_dir, exist_ok=True)
 
-        self.shared_files.export(output_dir)
-
-        benchmark_xml = self.tailoring.xml()
-        benchmark_xml_str = etree.tostring(benchmark_xml,
-                                           encoding='utf-8',
-                                           xml_declaration=True,
-                                           pretty_print=True).decode()
+        self.shared_files.export(output_dir, jobs=APPDATA['jobs'],
+                                 link=link_files)
 
         if output_file is None:
             output_file = os.path.join(
@@ -620,7 +881,7 @@ class XccdfYamlTailoringParser(XccdfYamlParser, StatusParserMixin):
         else:
             output_file = os.path.join(output_dir, output_file)
 
-        with open(output_file, 'w') as f:
-            f.write(benchmark_xml_str)
+        with open(output_file, 'wb') as f:
+            self.tailoring.write(f)
 
         return output_file
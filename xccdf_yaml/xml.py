@@ -1,22 +1,84 @@
+import codecs
+import copy
+import os
+import re
+import sys
+import tempfile
+
 import lxml.etree as etree
-from collections import OrderedDict
 from operator import itemgetter
 
+# Byte order mark, XML declaration and whitespaces at the start of a
+# document, all of them are optional
+re_declaration = re.compile(r'^\ufeff?(?:\s*<\?xml\s[^>]*\?>)?\s*')
+re_declaration_bytes = re.compile(
+    br'^(?:\xef\xbb\xbf)?(?:\s*<\?xml\s[^>]*\?>)?\s*')
+re_encoding = re.compile(
+    br'^(?:\xef\xbb\xbf)?\s*<\?xml\s[^>]*?encoding\s*=\s*["\']([\w.:-]+)["\']')
+
+# Clark notation tag names keyed by (namespace URI, local name), shared by
+# all elements regardless of the module they are defined in.
+_qnames = {}
+
+
+def qname(uri, name):
+    """ Returns '{uri}name' tag, building it only once per process """
+    key = (uri, name)
+    tag = _qnames.get(key)
+    if tag is None:
+        tag = _qnames[key] = sys.intern(etree.QName(uri, name).text)
+    return tag
+
+
+def _declared_encoding(head):
+    """ Returns encoding of XML document by its first bytes """
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    match = re_encoding.match(head)
+    if match is None:
+        return 'utf-8'
+    return match.group(1).decode()
+
 
 class XmlCommon(object):
     __elements__ = None
     __elements_order__ = None
+    # Elements with __stream__ set are written by XmlWriter child by child
+    # instead of being rendered as a single lxml tree.
+    __stream__ = False
+    # Large benchmarks consist of hundreds of thousands of elements, so
+    # every subclass declares __slots__ to avoid per-instance __dict__.
+    __slots__ = ('_name', '_nsmap', '_ns', '_children', '_attrs', '_text',
+                 '_object', '_xml', '_parent', '_elements_order')
 
     def __init__(self, name, ns=None, nsmap=None):
-        self._name = name
+        # Tag names are repeated by many elements, keep only one copy
+        self._name = sys.intern(name)
         self._nsmap = nsmap or {}
         self._ns = ns
-        self._children = OrderedDict()
-        # Use OrderedDict for storing attributes to prevent changes in
-        # attributes ordering on each convertion.
-        self._attrs = OrderedDict()
+        # Children grouped by tag name. Every group maps id() of a child to
+        # the child, so membership checks don't depend on the group size.
+        # Plain dicts keep insertion order, so children and attributes
+        # ordering doesn't change on each convertion.
+        self._children = {}
+        self._attrs = {}
         self._text = None
         self._object = None
+        # Rendered lxml tree is kept until the element or any of its
+        # descendants is modified.
+        self._xml = None
+        self._parent = None
+        self._elements_order = self.__elements_order__
+
+    def changed(self):
+        """ Drops rendered tree of the element and of its ancestors.
+        Must be called by every method which modifies element state used
+        by xml() or update_elements().
+        """
+        element = self
+        while element is not None and element._xml is not None:
+            element._xml = None
+            element = element._parent
 
     def namespace(self, ns=None):
         return self._nsmap[ns]
@@ -24,31 +86,58 @@ class XmlCommon(object):
     def elements(self, name=None):
         if name is None:
             for children in self._children.values():
-                for child in children:
+                for child in children.values():
                     yield child
         else:
-            for child in self._children.get(name, []):
+            for child in self._children.get(name, {}).values():
                 yield child
 
+    def set_elements_order(self, order):
+        """ Overrides class __elements_order__ for the element """
+        self._elements_order = order
+        self.changed()
+        return self
+
+    def ordered_elements(self):
+        if self._elements_order is None:
+            for child in self.elements():
+                yield child
+        else:
+            for key in self._elements_order:
+                for child in self._children.get(key, {}).values():
+                    yield child
+            for key, children in self._children.items():
+                if key in self._elements_order:
+                    continue
+                for child in children.values():
+                    yield child
+
+    def has_content(self):
+        return bool(self._object or self._text)
+
     def tag(self, name, ns=None):
         namespace = ns or self._ns
-        return etree.QName(self._nsmap[namespace], name)
+        return qname(self._nsmap[namespace], name)
 
     def remove_elements(self, name=None, elements=[]):
+        self.changed()
         if name:
             self._children.pop(name, None)
         else:
             for element in elements:
                 name = element._name
                 try:
-                    self._children[name].remove(element)
-                except (KeyError, IndexError):
+                    self._children[name].pop(id(element), None)
+                except KeyError:
                     pass
 
     def append(self, element):
-        elements = self._children.setdefault(element._name, [])
-        if element not in elements:
-            elements.append(element)
+        elements = self._children.setdefault(element._name, {})
+        if id(element) not in elements:
+            elements[id(element)] = element
+            if isinstance(element, XmlCommon):
+                element._parent = self
+            self.changed()
         return element
 
     def sub_element(self, name, ns=None):
@@ -66,17 +155,21 @@ class XmlCommon(object):
 
     def set_text(self, text):
         self._text = text
+        self.changed()
         return self
 
     def set_object(self, obj):
         self._object = obj
+        self.changed()
         return self
 
     def get_attr(self, name):
         return self._attrs.get(name)
 
     def set_attr(self, name, value):
-        self._attrs[name] = value
+        if self._attrs.get(name) != value:
+            self._attrs[name] = value
+            self.changed()
         return self
 
     def set_attrs(self, *args, **kwargs):
@@ -84,41 +177,280 @@ class XmlCommon(object):
         attrs.update(kwargs)
         for key, value in sorted(attrs.items(), key=itemgetter(0)):
             self._attrs[key] = value
+        self.changed()
         return self
 
     def update_elements(self):
         return
 
-    def xml(self):
+    def xml(self, cache=True):
+        """ Returns element as lxml tree. Tree is kept until the element
+        is changed, unless cache is False: XmlWriter renders elements
+        once, so keeping their trees would only hold memory.
+        """
+        if self._xml is not None:
+            return self._xml
+
         self.update_elements()
 
         element = etree.Element(self.tag(self._name), nsmap=self._nsmap)
         for key, value in self._attrs.items():
             element.set(key, value)
         if self._object:
-            element.extend(self._object.xml())
+            children = self._object.xml()
+            if not cache:
+                # extend() moves the object's nodes, keep them for the
+                # next rendering
+                children = [copy.deepcopy(x) for x in children]
+            element.extend(children)
         elif self._text:
             element.text = self._text
         else:
-            if self.__elements_order__ is None:
-                for children in self._children.values():
-                    for child in children:
-                        element.append(child.xml())
-            else:
-                for key in self.__elements_order__:
-                    for child in self._children.get(key, []):
-                        element.append(child.xml())
-                for key in self._children.keys():
-                    if key in self.__elements_order__:
-                        continue
-                    for child in self._children.get(key, []):
-                        element.append(child.xml())
+            for child in self.ordered_elements():
+                element.append(child.xml(cache=cache))
+        if cache:
+            self._xml = element
         return element
 
+    def write(self, f, xml_declaration=True):
+        """ Serializes element into binary file f using XmlWriter. """
+        writer = XmlWriter(f)
+        if xml_declaration:
+            writer.write_declaration()
+        writer.write(self)
+
     def __str__(self):
         return etree.tostring(self.xml(), pretty_print=True).decode()
 
 
+class XmlSpool(object):
+    """ Temporary file holding serialized fragments until they are
+    written to the output document.
+    """
+    __slots__ = ('_file', )
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+
+    def store(self, content):
+        offset = self._file.seek(0, os.SEEK_END)
+        self._file.write(content)
+        return SpooledContent(self, offset, len(content))
+
+    def read(self, offset, size):
+        self._file.seek(offset)
+        return self._file.read(size)
+
+    def close(self):
+        self._file.close()
+
+
+class SpooledContent(object):
+    __slots__ = ('spool', 'offset', 'size')
+
+    def __init__(self, spool, offset, size):
+        self.spool = spool
+        self.offset = offset
+        self.size = size
+
+    def read(self):
+        return self.spool.read(self.offset, self.size)
+
+    def write(self, f):
+        f.write(self.read())
+
+
+class FileContent(object):
+    """ Content of XML document stored in a file, without declaration.
+    It is copied to the output by chunks, documents in encodings other
+    than UTF-8 are transcoded on the way.
+    """
+    CHUNK_SIZE = 1024 * 1024
+    # Declaration is looked for in this many first bytes of the file
+    HEAD_SIZE = 1024
+    __slots__ = ('path', )
+
+    def __init__(self, path):
+        self.path = path
+
+    def _chunks(self):
+        with open(self.path, 'rb') as f:
+            head = f.read(self.HEAD_SIZE)
+            encoding = _declared_encoding(head)
+            if codecs.lookup(encoding).name == 'utf-8':
+                match = re_declaration_bytes.match(head)
+                yield head[match.end():]
+                for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b''):
+                    yield chunk
+                return
+
+        with open(self.path, encoding=encoding) as f:
+            head = f.read(self.HEAD_SIZE)
+            match = re_declaration.match(head)
+            yield head[match.end():].encode()
+            for chunk in iter(lambda: f.read(self.CHUNK_SIZE), ''):
+                yield chunk.encode()
+
+    def read(self):
+        return b''.join(self._chunks())
+
+    def write(self, f):
+        for chunk in self._chunks():
+            f.write(chunk)
+
+
+class XmlFragment(object):
+    """ Element already serialized by XmlWriter.render() at given depth.
+
+    Fragments can be put into XmlCommon children in place of the element
+    they were rendered from. XmlWriter outputs their content as is, xml()
+    parses it back for the rest of the code.
+    """
+    __slots__ = ('_name', '_content', 'depth')
+
+    # Namespaces declared by ancestors of the rendered element, those are
+    # omitted in the content
+    nsmap = None
+
+    def __init__(self, name, content, depth):
+        self._name = name
+        self._content = content
+        self.depth = depth
+
+    @property
+    def content(self):
+        if isinstance(self._content, bytes):
+            return self._content
+        return self._content.read()
+
+    def xml(self, cache=True):
+        """ Returns content parsed to lxml tree. Indentation of the
+        content is kept, so it is output as it was rendered.
+        """
+        wrapper = etree.tostring(etree.Element('fragment', nsmap=self.nsmap))
+        content = b''.join((wrapper[:-2], b'>', self.content, b'</fragment>'))
+        element = etree.fromstring(content, etree.XMLParser(huge_tree=True))[0]
+        element.tail = None
+        return element
+
+    def write(self, f):
+        if isinstance(self._content, bytes):
+            f.write(self._content)
+        else:
+            self._content.write(f)
+
+
+class XmlWriter(object):
+    """ Writes XmlCommon tree to a binary file incrementally.
+
+    Output is the same as etree.tostring(element.xml(), encoding='utf-8',
+    xml_declaration=True, pretty_print=True) but elements with __stream__
+    set are never rendered as a whole: their start tag is written first,
+    then every child is rendered separately and written right away.
+    """
+    DECLARATION = b"<?xml version='1.0' encoding='utf-8'?>\n"
+
+    def __init__(self, f):
+        self._f = f
+        self._ancestors = []
+
+    @staticmethod
+    def _chain(ancestors):
+        top = leaf = None
+        for ancestor in ancestors:
+            tag = ancestor.tag(ancestor._name)
+            if leaf is None:
+                top = leaf = etree.Element(tag, nsmap=ancestor._nsmap)
+            else:
+                leaf = etree.SubElement(leaf, tag, nsmap=ancestor._nsmap)
+        return top, leaf
+
+    @staticmethod
+    def _strip_lines(content, head, tail):
+        start = 0
+        for _ in range(head):
+            start = content.index(b'\n', start) + 1
+        end = len(content)
+        for _ in range(tail + 1):
+            end = content.rindex(b'\n', 0, end)
+        return content[start:end + 1]
+
+    @classmethod
+    def render(cls, element, ancestors=()):
+        """ Returns element serialized as if it were written with given
+        ancestors chain (outermost first).
+        """
+        if isinstance(element, XmlFragment):
+            return element.content
+
+        if isinstance(element, XmlCommon):
+            xml = element.xml(cache=False)
+        else:
+            xml = element
+        if not ancestors:
+            return etree.tostring(xml, encoding='utf-8', pretty_print=True)
+
+        # Rendered tree may be cached as a part of the parent's tree
+        parent = xml.getparent()
+        if parent is not None:
+            index = parent.index(xml)
+
+        top, leaf = cls._chain(ancestors)
+        leaf.append(xml)
+        content = etree.tostring(top, encoding='utf-8', pretty_print=True)
+        leaf.remove(xml)
+
+        if parent is not None:
+            parent.insert(index, xml)
+        depth = len(ancestors)
+        return cls._strip_lines(content, depth, depth)
+
+    def _is_streamed(self, element):
+        if not isinstance(element, XmlCommon) or not element.__stream__:
+            return False
+        return not element.has_content()
+
+    def write_declaration(self):
+        self._f.write(self.DECLARATION)
+
+    def write(self, element):
+        if isinstance(element, XmlFragment):
+            if element.depth != len(self._ancestors):
+                raise Exception("Fragment {} rendered at depth {} can't be "
+                                "written at depth {}"
+                                .format(element._name, element.depth,
+                                        len(self._ancestors)))
+            element.write(self._f)
+            return
+
+        if not self._is_streamed(element):
+            self._f.write(self.render(element, self._ancestors))
+            return
+
+        element.update_elements()
+        children = list(element.ordered_elements())
+        if not children:
+            self._f.write(self.render(element, self._ancestors))
+            return
+
+        xml = etree.Element(element.tag(element._name),
+                            nsmap=element._nsmap)
+        for key, value in element._attrs.items():
+            xml.set(key, value)
+        xml.append(etree.Comment())
+        lines = self.render(xml, self._ancestors).split(b'\n')
+        start_tag, end_tag = lines[0], lines[2]
+
+        self._f.write(start_tag + b'\n')
+        self._ancestors.append(element)
+        try:
+            for child in children:
+                self.write(child)
+        finally:
+            self._ancestors.pop()
+        self._f.write(end_tag + b'\n')
+
+
 class DublinCoreElementBase(XmlCommon):
     __elements__ = [
         'contributor',
@@ -137,6 +469,7 @@ class DublinCoreElementBase(XmlCommon):
         'title',
         'type',
     ]
+    __slots__ = ()
 
     def __init__(self, *args, **kwargs):
         kwargs.setdefault('nsmap', {})
@@ -2,32 +2,119 @@ import os
 import re
 import yaml
 
+from concurrent.futures import ProcessPoolExecutor
 from io import StringIO
-from xccdf_yaml.misc import deepmerge, resolve_file_ref
+from xccdf_yaml.appdata import APPDATA, init_worker
+from xccdf_yaml.cache import digest
+from xccdf_yaml.misc import deepmerge, resolve_file_ref, LazySequence
 
 re_include = re.compile(r'^#%include%\s*(.*?)\s*$', re.MULTILINE)
 
 
+def _load_yaml(filename, lazy=False):
+    cache = APPDATA['yaml_cache']
+    if cache is not None:
+        entry = cache.get(filename, lazy=lazy)
+        if entry is not None:
+            return entry
+
+    with open(filename) as f:
+        loader = DefaultYamlLoader(f)
+        loader.lazy = lazy
+        try:
+            data = loader.get_single_data()
+        finally:
+            loader.dispose()
+
+    if cache is not None:
+        cache.set(filename, data, loader.dependencies, lazy=lazy)
+
+    return data, loader.dependencies
+
+
+def _load_yaml_worker(filename):
+    cache = APPDATA['yaml_cache']
+    if cache is not None:
+        cache.hits = cache.misses = 0
+    data, dependencies = _load_yaml(filename)
+    stats = cache.stats() if cache is not None else {}
+    return data, dependencies, stats
+
+
+def load_yaml(filename, lazy=False):
+    """ Loads YAML document from filename. In lazy mode !include-dir
+    produces IncludeDir sequence which loads files only when iterated.
+    """
+    data, _ = _load_yaml(filename, lazy=lazy)
+    return data
+
+
+class IncludeDir(LazySequence):
+    def __init__(self, filenames):
+        self.filenames = filenames
+
+    def __iter__(self):
+        for filename in self.filenames:
+            content = load_yaml(filename, lazy=True)
+            if isinstance(content, list):
+                for item in content:
+                    yield item
+            else:
+                yield content
+
+
 class YamlTemplate(object):
     def __init__(self, filename):
-        with open(filename) as f:
-            self._content = yaml.load(f, YamlLoader)
+        self._content, self.dependencies = _load_yaml(filename)
         self.filename = filename
 
     def merge(self, template_name, data):
+        # Template is shared, so merged data must not reference its lists
         if template_name is None:
-            return deepmerge(self._content, data)
-        return deepmerge(self._content[template_name], data)
+            return deepmerge(self._content, data, deep_copy=True)
+        return deepmerge(self._content[template_name], data, deep_copy=True)
+
+    def is_changed(self):
+        """ Returns True if any file the template is loaded from changed """
+        for path, value in self.dependencies.items():
+            if digest(path) != value:
+                return True
+        return False
+
+
+_templates = {}
+
 
+def get_template(filename):
+    """ Returns YamlTemplate loaded from filename. Templates are loaded
+    once per process and shared by all loaders, so documents converted
+    in a batch don't load them again. Template is reloaded if its files
+    changed since it was loaded.
+    """
+    filename = os.path.abspath(filename)
+    template = _templates.get(filename)
+    if template is None or template.is_changed():
+        template = _templates[filename] = YamlTemplate(filename)
+    return template
+
+
+class YamlLoaderMixin(object):
+    lazy = False
 
-class YamlLoader(yaml.Loader):
     def __init__(self, stream):
         try:
             self._root = os.path.split(stream.name)[0]
         except AttributeError:
             self._root = os.path.curdir
+        self._dependencies = {}
         super().__init__(self._load(stream.name))
-        self._templates = {}
+
+    @property
+    def dependencies(self):
+        return self._dependencies
+
+    def _add_dependency(self, path):
+        self._dependencies[os.path.abspath(path)] = digest(path)
 
     def _load(self, filename):
         tree = self._build_tree(filename)
@@ -67,34 +154,64 @@ class YamlLoader(yaml.Loader):
     def _load_yaml_files(self, files):
         stream = StringIO()
         for filename in files:
+            self._add_dependency(filename)
             if os.path.exists(filename):
                 stream.write('### {} ###\n'.format(filename))
                 stream.write(open(filename).read())
         return stream.getvalue()
 
+    def _include_file(self, filename):
+        data, dependencies = _load_yaml(filename, lazy=self.lazy)
+        self._dependencies.update(dependencies)
+        return data
+
+    def _include_files(self, filenames):
+        jobs = APPDATA['jobs']
+        if jobs < 2 or len(filenames) < 2:
+            for filename in filenames:
+                yield self._include_file(filename)
+            return
+
+        cache = APPDATA['yaml_cache']
+        with ProcessPoolExecutor(max_workers=jobs,
+                                 initializer=init_worker,
+                                 initargs=(APPDATA.copy(),)) as executor:
+            for data, dependencies, stats in \
+                    executor.map(_load_yaml_worker, filenames):
+                self._dependencies.update(dependencies)
+                if cache is not None:
+                    cache.hits += stats['hits']
+                    cache.misses += stats['misses']
+                yield data
+
     def include(self, node):
         filename = os.path.join(self._root, self.construct_scalar(node))
-
-        with open(filename, 'r') as f:
-            return yaml.load(f, YamlLoader)
+        return self._include_file(filename)
 
     def include_dir(self, node):
         path = os.path.join(self._root, self.construct_scalar(node))
-        data = []
+        self._add_dependency(path)
+        filenames = []
         for name in sorted(os.listdir(path)):
             filename = os.path.join(path, name)
             if os.path.isfile(filename):
                 if name.endswith('.yaml') or name.endswith('.yml'):
-                    with open(filename, 'r') as f:
-                        content = yaml.load(f, YamlLoader)
-                        if isinstance(content, list):
-                            data.extend(content)
-                        else:
-                            data.append(content)
+                    filenames.append(filename)
+
+        if self.lazy:
+            return IncludeDir(filenames)
+
+        data = []
+        for content in self._include_files(filenames):
+            if isinstance(content, list):
+                data.extend(content)
+            else:
+                data.append(content)
         return data
 
     def include_raw(self, node):
         filename = os.path.join(self._root, self.construct_scalar(node))
+        self._add_dependency(filename)
 
         with open(filename, 'r') as f:
             return f.read()
@@ -102,18 +219,29 @@ class YamlLoader(yaml.Loader):
     def merge_template(self, node):
         data = self.construct_mapping(node, True)
 
-        filename = data['filename']
-        if filename in self._templates:
-            template = self._templates[filename]
-        else:
-            path, filename = resolve_file_ref(filename)
-            template = YamlTemplate(os.path.join(path, filename))
-            self._templates[filename] = template
+        path, filename = resolve_file_ref(data['filename'])
+        template = get_template(os.path.join(path, filename))
+        self._dependencies.update(template.dependencies)
 
         return template.merge(data.get('key'), data['content'])
 
 
-YamlLoader.add_constructor('!include', YamlLoader.include)
-YamlLoader.add_constructor('!include-dir', YamlLoader.include_dir)
-YamlLoader.add_constructor('!include-raw', YamlLoader.include_raw)
-YamlLoader.add_constructor('!merge', YamlLoader.merge_template)
+class YamlLoader(YamlLoaderMixin, yaml.Loader):
+    pass
+
+
+if yaml.__with_libyaml__:
+    class CYamlLoader(YamlLoaderMixin, yaml.CLoader):
+        pass
+
+    DefaultYamlLoader = CYamlLoader
+else:
+    CYamlLoader = None
+    DefaultYamlLoader = YamlLoader
+
+
+for loader_cls in filter(None, [YamlLoader, CYamlLoader]):
+    loader_cls.add_constructor('!include', loader_cls.include)
+    loader_cls.add_constructor('!include-dir', loader_cls.include_dir)
+    loader_cls.add_constructor('!include-raw', loader_cls.include_raw)
+    loader_cls.add_constructor('!merge', loader_cls.merge_template)